@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+import pygame
+
+# Sound effect names emitted by the simulation and the files they load from
+SOUND_FILES = {
+    "catch": "catch.wav",
+    "damage": "damage.wav",
+    "powerup": "powerup.wav",
+    "level_up": "level_up.wav",
+}
+
+
+# Sound effects for the game. The WAV files are decoded on a background
+# thread so they never delay the first frame; until a file has loaded (or if
+# it is missing) its name maps to one shared, short silent buffer. Each file
+# is decoded once, even when several names point at it. Playback is limited
+# per effect: a repeat within min_interval seconds is dropped, and at most
+# max_copies of the same effect play at once, so a burst of catches cannot
+# take over every mixer channel.
+class SoundManager:
+    def __init__(self, sound_files=SOUND_FILES, max_copies=2, min_interval=0.05):
+        self.sound_files = dict(sound_files)
+        self.max_copies = max_copies
+        self.min_interval = min_interval
+        self.enabled = pygame.mixer.get_init() is not None
+
+        self.cache = {}  # path -> decoded Sound
+        self.sounds = {}
+        self.channels = {name: [] for name in self.sound_files}
+        self.last_played = dict.fromkeys(self.sound_files, -min_interval)
+        self.loader = None
+
+        if self.enabled:
+            silent = self.silent_sound()
+            self.sounds = dict.fromkeys(self.sound_files, silent)
+
+    # Tenth of a second of silence in the mixer's own format
+    def silent_sound(self):
+        import numpy  # Deferred: only needed once the mixer is up
+
+        frequency, _, channels = pygame.mixer.get_init()
+        shape = (frequency // 10, channels) if channels > 1 else (frequency // 10,)
+        return pygame.sndarray.make_sound(numpy.zeros(shape, dtype=numpy.int16))
+
+    # Start decoding the sound files in the background
+    def load_async(self):
+        if self.enabled and self.loader is None:
+            self.loader = threading.Thread(target=self.load_all, name="sound-loader", daemon=True)
+            self.loader.start()
+        return self.loader
+
+    def load_all(self):
+        for name, path in self.sound_files.items():
+            sound = self.cache.get(path)
+            if sound is None and os.path.exists(path):
+                try:
+                    sound = self.cache[path] = pygame.mixer.Sound(path)
+                except pygame.error as e:
+                    print(f"Could not load {path}: {e}")
+            if sound is not None:
+                self.sounds[name] = sound
+
+    # Block until background loading has finished
+    def wait(self):
+        if self.loader is not None:
+            self.loader.join()
+
+    # Play a named effect, subject to the per-effect limits. Returns whether
+    # it was started.
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return False
+        now = time.perf_counter()
+        if now - self.last_played[name] < self.min_interval:
+            return False
+        playing = [channel for channel in self.channels[name] if channel.get_sound() is sound]
+        if len(playing) >= self.max_copies:
+            self.channels[name] = playing
+            return False
+
+        channel = sound.play()
+        if channel is None:  # Every mixer channel is busy
+            return False
+        playing.append(channel)
+        self.channels[name] = playing
+        self.last_played[name] = now
+        return True
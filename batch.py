@@ -0,0 +1,137 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from bots import BOTS
+from simulation import GameState, BASE_TICK_RATE, make_rules
+
+# Columns of the results file, one row per game
+RESULT_COLUMNS = [
+    ("game", numpy.int32), ("param_set", numpy.int16), ("seed", numpy.uint64),
+    ("bot", numpy.int8), ("ticks", numpy.int32), ("score", numpy.int32),
+    ("level", numpy.int8), ("health", numpy.int16), ("game_over", numpy.bool_),
+]
+
+
+# Play one game to the end or to max_ticks
+def play_game(seed, rules, bot, max_ticks):
+    state = GameState(seed, rules=rules)
+    step = state.step
+    basket = state.baskets[0]
+    while not state.game_over and state.tick < max_ticks:
+        step(bot(state, basket))
+    return state
+
+
+# Worker entry point: play a chunk of games and return one result row each.
+# Games are sent in chunks so the cost of shipping work between processes is
+# paid once per chunk rather than once per game.
+def run_chunk(jobs, param_sets, max_ticks):
+    rules = [make_rules(overrides) for overrides in param_sets]
+    bot_names = list(BOTS)
+    rows = []
+    for game, param_set, seed, bot in jobs:
+        state = play_game(seed, rules[param_set], BOTS[bot_names[bot]], max_ticks)
+        rows.append((game, param_set, seed, bot, state.tick, state.score,
+                     state.level, state.health, state.game_over))
+    return rows
+
+
+# Play games_per_set games for every parameter set and bot over a process
+# pool. Returns the results as a dict of NumPy columns. Games are split into
+# about four chunks per worker, so every worker stays busy and a slow chunk
+# near the end does not leave the rest idle; max_chunk_size caps a chunk on
+# large runs.
+def run_batch(param_sets, bots, games_per_set, max_ticks, seed=0, workers=None, max_chunk_size=50):
+    bot_names = list(BOTS)
+    jobs = []
+    for param_set in range(len(param_sets)):
+        for bot in bots:
+            for i in range(games_per_set):
+                # Every (bot, parameter set) pair plays the same seeds
+                jobs.append((len(jobs), param_set, seed + i, bot_names.index(bot)))
+    workers = workers or os.cpu_count() or 1
+    chunk_size = min(max_chunk_size, max(1, math.ceil(len(jobs) / (workers * 4))))
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, chunk, param_sets, max_ticks) for chunk in chunks]
+        for done, future in enumerate(futures, 1):
+            rows.extend(future.result())
+            print(f"\r{done}/{len(chunks)} chunks", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    rows.sort()
+    return {name: numpy.array([row[i] for row in rows], dtype=dtype)
+            for i, (name, dtype) in enumerate(RESULT_COLUMNS)}
+
+
+# Write the result columns, the parameter sets and the bot names to one
+# compressed .npz file
+def save_results(path, results, param_sets):
+    numpy.savez_compressed(path, **results, param_sets=numpy.array([json.dumps(p) for p in param_sets]),
+                           bots=numpy.array(list(BOTS)))
+
+
+# Print survival time, score percentiles and the level distribution for each
+# parameter set and bot
+def summarize(results, param_sets, tick_rate=BASE_TICK_RATE):
+    bot_names = list(BOTS)
+    print(f"{'set':>4} {'bot':<8}{'games':>7}{'survival s':>12}{'died':>7}"
+          f"{'score p10':>11}{'p50':>8}{'p90':>8}  levels 1-5")
+    for param_set in range(len(param_sets)):
+        for bot in numpy.unique(results["bot"]).tolist():
+            rows = (results["param_set"] == param_set) & (results["bot"] == bot)
+            if not rows.any():
+                continue
+            ticks, scores = results["ticks"][rows], results["score"][rows]
+            p10, p50, p90 = numpy.percentile(scores, (10, 50, 90)).tolist()
+            levels = numpy.bincount(results["level"][rows], minlength=6)[1:6]
+            print(f"{param_set:>4} {bot_names[bot]:<8}{rows.sum():>7}{ticks.mean() / tick_rate:>12.1f}"
+                  f"{results['game_over'][rows].mean() * 100:>6.0f}%"
+                  f"{p10:>11.0f}{p50:>8.0f}{p90:>8.0f}  {' '.join(str(c) for c in levels.tolist())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless games in parallel for difficulty tuning")
+    parser.add_argument("--sweep", metavar="JSON",
+                        help="JSON file with a list of rule overrides, one parameter set each (default: [{}])")
+    parser.add_argument("--games", type=int, default=100, help="games per parameter set and bot")
+    parser.add_argument("--bots", nargs="+", default=["greedy"], choices=list(BOTS), help="basket AIs to play with")
+    parser.add_argument("--max-minutes", type=float, default=10, help="stop games that survive this long")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; games use seed, seed+1, ...")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", default="batch_results.npz", help="where to write the result columns")
+    args = parser.parse_args(argv)
+
+    param_sets = [{}]
+    if args.sweep:
+        with open(args.sweep) as f:
+            param_sets = json.load(f)
+        if not isinstance(param_sets, list) or not all(isinstance(p, dict) for p in param_sets):
+            parser.error(f"{args.sweep} must hold a JSON list of rule override objects")
+    for overrides in param_sets:
+        try:
+            make_rules(overrides)
+        except (KeyError, ValueError) as e:
+            parser.error(str(e))
+
+    start = time.perf_counter()
+    results = run_batch(param_sets, args.bots, args.games, int(args.max_minutes * 60 * BASE_TICK_RATE),
+                        args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    save_results(args.output, results, param_sets)
+    summarize(results, param_sets)
+    print(f"{len(results['game'])} games, {results['ticks'].sum()} ticks in {elapsed:.1f} s "
+          f"({results['ticks'].sum() / elapsed:.0f} ticks/s); wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
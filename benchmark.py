@@ -0,0 +1,241 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+# Run headless: no window and no audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import numpy
+
+from simulation import GameState, Inputs, WIDTH, HEIGHT, block_size, BLOCK_TYPES, PURPLE
+
+SEED = 1234
+
+
+# Scripted basket: sweep across the screen and back
+def sweep_inputs(tick):
+    return Inputs(tick % 200 < 100, tick % 200 >= 100)
+
+
+# Keep the game alive and at level 1
+def steady_state(state, tick, rng):
+    state.health = 100
+    state.score %= 500
+
+
+# Level 5 with blocks spawning as often as the spawn rate formula allows
+def level5_flood(state, tick, rng):
+    if tick == 0:
+        state.score = 5000
+        while state.check_level_up():
+            pass
+    state.health = 100
+    state.block_spawn_rate = 5
+
+
+# Magnet active with the field topped up to 500 blocks
+def magnet_500(state, tick, rng):
+    state.health = 100
+    if "magnet" not in state.power_up_ends:
+        state.start_power_up(state.baskets[0], "magnet", 600)
+    names = list(BLOCK_TYPES)
+    while len(state.blocks) < 500:
+        state.blocks.add(rng.uniform(0, WIDTH - block_size), rng.uniform(0, HEIGHT - 100),
+                         rng.choice(names), state.block_speed)
+
+
+# Shield active while particle bursts go off every tick
+def shield_particle_storm(state, tick, rng):
+    state.health = 100
+    if "shield" not in state.power_up_ends:
+        state.start_power_up(state.baskets[0], "shield", 500)
+    for _ in range(10):
+        state.emit_particles(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), PURPLE, 20)
+
+
+# Climb from level 1 to 5 once a second, each level up firing a 1000 particle burst
+def level_up_bursts(state, tick, rng):
+    state.health = 100
+    if tick % 60 == 0:
+        state.level = 1
+        state.score = 5000
+
+
+SCENARIOS = {
+    "steady_level1": steady_state,
+    "level5_flood": level5_flood,
+    "magnet_500": magnet_500,
+    "shield_particle_storm": shield_particle_storm,
+    "level_up_bursts": level_up_bursts,
+}
+
+
+# Run one tick of the full game: scenario setup, simulation, particles,
+# drawing and presenting the frame
+def run_tick(game, state, tick, setup, rng):
+    state.events = []
+    setup(state, tick, rng)
+    scripted_events = state.events
+    events = state.step(sweep_inputs(tick))
+    game.handle_events(scripted_events + events)
+    game.update_particles()
+    game.draw_game(state)
+    game.viewport.present()
+
+
+# Run one scenario and return its measurements. game_args are extra main.py
+# options, such as a display size and render scale.
+def run_scenario(name, ticks=1200, warmup=60, alloc_ticks=200, game_args=()):
+    import main as game
+    game.init(game.parse_args(["--scores", os.path.join(tempfile.mkdtemp(), "scores.db"), *game_args]))
+    game.start_audio()
+
+    setup = SCENARIOS[name]
+    rng = random.Random(SEED)
+    state = GameState(SEED)
+    game.particles.clear(SEED)
+    game.render_rng.seed(SEED)
+
+    for tick in range(warmup):
+        run_tick(game, state, tick, setup, rng)
+
+    frame_times = numpy.zeros(ticks)
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for i in range(ticks):
+        tick_start = perf_counter()
+        run_tick(game, state, warmup + i, setup, rng)
+        frame_times[i] = perf_counter() - tick_start
+    elapsed = perf_counter() - start
+
+    # Allocation pass: tracemalloc slows everything down, so it runs after the
+    # timed pass. For each tick, record how far traced memory rose above its
+    # level at the start of the tick.
+    alloc_peaks = numpy.zeros(alloc_ticks)
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for i in range(alloc_ticks):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        run_tick(game, state, warmup + ticks + i, setup, rng)
+        _, peak = tracemalloc.get_traced_memory()
+        alloc_peaks[i] = peak - before
+    tracemalloc.stop()
+    net_blocks = sys.getallocatedblocks() - blocks_before
+
+    p50, p95, p99 = (numpy.percentile(frame_times, (50, 95, 99)) * 1000).tolist()
+    return {
+        "ticks": ticks,
+        "ticks_per_sec": round(ticks / elapsed, 1),
+        "frame_ms": {"mean": round(float(frame_times.mean()) * 1000, 4),
+                     "p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4),
+                     "max": round(float(frame_times.max()) * 1000, 4)},
+        "alloc_bytes_per_tick": {"mean": round(float(alloc_peaks.mean()), 1),
+                                 "p99": round(float(numpy.percentile(alloc_peaks, 99)), 1)},
+        "net_blocks_per_tick": round(net_blocks / alloc_ticks, 2),
+        "peak_rss_kib": peak_rss_kib(),
+        "final": {"blocks": len(state.blocks), "power_ups": len(state.power_ups),
+                  "particles": len(game.particles), "level": state.level},
+    }
+
+
+# Peak resident set size of this process, in KiB
+def peak_rss_kib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+# Current git commit, if the tree is a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Run scenarios, each in a fresh process so peak RSS is per scenario
+def run_benchmarks(names, ticks, game_args=()):
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        # Workers are shut down normally rather than terminated: SDL turns
+        # SIGTERM into a quit event, so a terminated worker would never exit
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(run_scenario, name, ticks, game_args=game_args).result()
+        print(f"{name:<24}{results[name]['ticks_per_sec']:>10.1f} ticks/s  "
+              f"p50 {results[name]['frame_ms']['p50']:.3f} ms  "
+              f"p99 {results[name]['frame_ms']['p99']:.3f} ms", file=sys.stderr)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "game_args": list(game_args),
+        "scenarios": results,
+    }
+
+
+# Print the change in ticks/s and p99 frame time against an earlier run
+def compare(base, current):
+    print(f"{'scenario':<24}{'ticks/s':>12}{'change':>9}{'p99 ms':>10}{'change':>9}")
+    for name, result in current["scenarios"].items():
+        old = base["scenarios"].get(name)
+        rate, p99 = result["ticks_per_sec"], result["frame_ms"]["p99"]
+        if old is None:
+            print(f"{name:<24}{rate:>12.1f}{'new':>9}{p99:>10.3f}{'new':>9}")
+            continue
+        rate_change = (rate / old["ticks_per_sec"] - 1) * 100
+        p99_change = (p99 / old["frame_ms"]["p99"] - 1) * 100
+        print(f"{name:<24}{rate:>12.1f}{rate_change:>+8.1f}%{p99:>10.3f}{p99_change:>+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmark scenarios for Falling Blocks Catcher")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--ticks", type=int, default=1200, help="timed ticks per scenario")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="BASE_JSON", help="compare against an earlier results file")
+    parser.add_argument("--display", metavar="WxH", help="window size to scale frames to, as in main.py")
+    parser.add_argument("--render-scale", metavar="SCALE", help="render scale, as in main.py")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+
+    game_args = []
+    if args.display:
+        game_args += ["--display", args.display]
+    if args.render_scale:
+        game_args += ["--render-scale", args.render_scale]
+    results = run_benchmarks(args.scenarios or list(SCENARIOS), args.ticks, game_args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
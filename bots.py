@@ -0,0 +1,60 @@
+import numpy
+
+from simulation import Inputs, NO_INPUT, basket_width, block_size, BLOCK_TYPES
+
+# Lookup table by block type id: is the block worth moving toward (does it add points)
+WANTED_BLOCKS = numpy.array([props["points"] > 0 for props in BLOCK_TYPES.values()])
+
+
+# Basket AIs: each takes a GameState and the basket it controls and returns
+# the Inputs for that basket's next tick
+
+# Never moves
+def idle_bot(state, basket):
+    return NO_INPUT
+
+
+# Sweeps across the screen and back, ignoring what is falling
+def sweep_bot(state, basket):
+    seconds = state.tick // state.tick_rate
+    return Inputs(seconds % 4 >= 2, seconds % 4 < 2)
+
+
+# Chases the lowest wanted block or power-up and otherwise sidesteps the
+# lowest harmful block above the basket
+def greedy_bot(state, basket):
+    center = basket.x + basket_width / 2
+    target = None
+    lowest = -1.0
+
+    blocks = state.blocks
+    n = len(blocks)
+    if n:
+        y = blocks.y[:n]
+        wanted = WANTED_BLOCKS[blocks.type_id[:n]]
+        if wanted.any():
+            i = numpy.flatnonzero(wanted)[y[wanted].argmax()]
+            target, lowest = blocks.x[i] + block_size / 2, y[i]
+    power_ups = state.power_ups
+    m = len(power_ups)
+    if m:
+        i = power_ups.y[:m].argmax()
+        if power_ups.y[i] > lowest:
+            target, lowest = power_ups.x[i] + block_size / 2, power_ups.y[i]
+
+    if target is None and n:
+        # Nothing to catch: step away from the lowest harmful block
+        harmful = ~WANTED_BLOCKS[blocks.type_id[:n]]
+        if harmful.any():
+            i = numpy.flatnonzero(harmful)[blocks.y[:n][harmful].argmax()]
+            x = blocks.x[i] + block_size / 2
+            if abs(x - center) < basket_width / 2 + block_size:
+                target = center + (basket_width if x < center else -basket_width)
+
+    if target is None:
+        return NO_INPUT
+    dead_zone = basket_width / 4
+    return Inputs(target < center - dead_zone, target > center + dead_zone)
+
+
+BOTS = {"idle": idle_bot, "sweep": sweep_bot, "greedy": greedy_bot}
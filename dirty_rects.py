@@ -0,0 +1,74 @@
+import math
+
+import pygame
+
+from simulation import basket_width, basket_height, block_size
+
+
+# Screen-space rect covered by a basket, including its outline and the shield glow
+def basket_rect(basket, alpha=1.0):
+    basket_x = basket.x_at(alpha)
+    if "shield" in basket.power_up_ends:
+        shield_radius = int(basket_width * 0.7) + 1
+        return pygame.Rect(basket_x + basket_width // 2 - shield_radius,
+                           basket.y + basket_height // 2 - shield_radius,
+                           shield_radius * 2, shield_radius * 2)
+    return pygame.Rect(basket_x, basket.y, basket_width, basket_height).inflate(4, 4)
+
+
+# Playfield rect multiplied by a render scale, rounded outwards with one
+# playfield pixel to spare for positions truncated before scaling
+def scale_rect(rect, scale):
+    left, top = math.floor(rect.left * scale), math.floor(rect.top * scale)
+    return pygame.Rect(left, top, math.ceil((rect.right + 1) * scale) - left,
+                       math.ceil((rect.bottom + 1) * scale) - top)
+
+
+# Screen-space rects covered by every moving object in the game, at the
+# interpolated positions they are drawn at. Object rects are multiplied by
+# the render scale; particle_bounds is already in screen space.
+def object_rects(state, particle_bounds=None, alpha=1.0, scale=1.0):
+    rects = [pygame.Rect(int(x), int(y), block_size, block_size)
+             for x, y, _ in state.blocks.items(alpha)]
+    rects.extend(pygame.Rect(int(x), int(y), block_size, block_size)
+                 for x, y, _ in state.power_ups.items(alpha))
+    rects.extend(basket_rect(basket, alpha) for basket in state.baskets)
+    if scale != 1:
+        rects = [scale_rect(rect, scale) for rect in rects]
+    if particle_bounds is not None:
+        rects.append(particle_bounds)
+    return rects
+
+
+# Tracks which parts of the screen changed between frames. A frame only needs
+# to repaint and present the union of where objects were last frame and where
+# they are now, unless the scene itself changed (level, pause, game over),
+# which forces one full repaint.
+class DirtyRectTracker:
+    def __init__(self):
+        self.previous = []
+        self.scene = None
+        self.full_redraw = True
+
+    # Force the next frame to repaint and present the whole screen
+    def invalidate(self):
+        self.full_redraw = True
+
+    # Switch to a new scene key; returns True when the whole screen must be redrawn
+    def enter_scene(self, scene):
+        if scene != self.scene:
+            self.scene = scene
+            self.full_redraw = True
+        full_redraw = self.full_redraw
+        self.full_redraw = False
+        return full_redraw
+
+    # Record this frame's rects and return everything that must be repainted
+    def collect(self, rects):
+        dirty = self.previous + rects
+        self.previous = rects
+        return dirty
+
+    # Start tracking from a fully repainted frame
+    def reset(self, rects):
+        self.previous = rects
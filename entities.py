@@ -0,0 +1,99 @@
+import numpy
+
+
+# Float columns, in the row order of EntityColumns.floats
+FLOAT_COLUMNS = ("x", "y", "speed", "prev_x", "prev_y")
+
+
+# Falling objects stored as parallel NumPy columns (x, y, speed, type id,
+# plus the position at the start of the current tick for interpolated
+# rendering). Only the first `count` slots are live. Moving, collision
+# testing and removal all work on whole columns, and removed slots are filled
+# from the tail (swap-remove) so the live range stays packed. The float
+# columns are rows of one 2-D array (`floats`), so copying positions or
+# reading several columns out is one NumPy call rather than one per column.
+class EntityColumns:
+    def __init__(self, type_names, capacity=64):
+        self.type_names = list(type_names)
+        self.type_ids = {name: i for i, name in enumerate(self.type_names)}
+        self.count = 0
+        self.type_id = numpy.zeros(capacity, dtype=numpy.int32)
+        self.set_floats(numpy.zeros((len(FLOAT_COLUMNS), capacity), dtype=numpy.float64))
+
+    # Use a new float array, with x, y etc. as views of its rows
+    def set_floats(self, floats):
+        self.floats = floats
+        self.x, self.y, self.speed, self.prev_x, self.prev_y = floats
+
+    def __len__(self):
+        return self.count
+
+    # Double the capacity of every column
+    def grow(self):
+        capacity = len(self.x) * 2
+        floats = numpy.zeros((len(FLOAT_COLUMNS), capacity), dtype=numpy.float64)
+        floats[:, :self.count] = self.floats[:, :self.count]
+        self.set_floats(floats)
+        type_id = numpy.zeros(capacity, dtype=numpy.int32)
+        type_id[:self.count] = self.type_id[:self.count]
+        self.type_id = type_id
+
+    # Append one object
+    def add(self, x, y, type_name, speed):
+        if self.count == len(self.x):
+            self.grow()
+        i = self.count
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.speed[i] = speed
+        self.type_id[i] = self.type_ids[type_name]
+        self.count += 1
+
+    # Remove every object whose slot is set in a boolean mask over the live
+    # range. Survivors from the tail are moved into the holes, so the cost is
+    # proportional to the number of removals rather than the number of objects.
+    def remove(self, mask):
+        removed = numpy.flatnonzero(mask)
+        if not len(removed):
+            return
+        new_count = self.count - len(removed)
+        holes = removed[removed < new_count]
+        survivors = new_count + numpy.flatnonzero(~mask[new_count:self.count])
+        self.floats[:, holes] = self.floats[:, survivors]
+        self.type_id[holes] = self.type_id[survivors]
+        self.count = new_count
+
+    # remove() for a short ascending list of slots, without building arrays
+    # for the mask; objects end up in exactly the same slots
+    def remove_slots(self, removed):
+        new_count = self.count - len(removed)
+        holes = [i for i in removed if i < new_count]
+        if holes:
+            gone = set(removed)
+            survivors = [i for i in range(new_count, self.count) if i not in gone]
+            self.floats[:, holes] = self.floats[:, survivors]
+            self.type_id[holes] = self.type_id[survivors]
+        self.count = new_count
+
+    def clear(self):
+        self.count = 0
+
+    # Remember where every object is before a tick moves it
+    def save_positions(self):
+        n = self.count
+        if n:
+            self.floats[3:, :n] = self.floats[:2, :n]
+
+    # Live (x, y, type name) tuples, for drawing and inspection. With alpha
+    # below 1 the positions are interpolated between the start and the end of
+    # the last tick.
+    def items(self, alpha=1.0):
+        n = self.count
+        names = self.type_names
+        x, y = self.x[:n], self.y[:n]
+        if alpha < 1:
+            prev_x, prev_y = self.prev_x[:n], self.prev_y[:n]
+            x = prev_x + (x - prev_x) * alpha
+            y = prev_y + (y - prev_y) * alpha
+        return [(x, y, names[t]) for x, y, t in
+                zip(x.tolist(), y.tolist(), self.type_id[:n].tolist())]
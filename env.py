@@ -0,0 +1,185 @@
+import numpy
+
+from simulation import (
+    GameState, Inputs, NO_INPUT, BASE_TICK_RATE, REGISTRY, POWERUP_TYPES,
+    WIDTH, HEIGHT, basket_width, basket_height, block_size,
+)
+
+# Discrete actions, by index: stand still, move left, move right
+ACTIONS = (NO_INPUT, Inputs(True, False), Inputs(False, True))
+
+# Background of rendered frames; dark gray rather than black so bombs show
+BACKGROUND = (30, 30, 40)
+BASKET_COLOR = (0, 0, 255)
+
+
+# Empty observation arrays for one game. Object rows are (dx, dy, speed)
+# relative to the basket's center, in playfield widths/heights and block
+# sizes per tick, nearest object first; unused rows are zero with type -1.
+# Timers are seconds left on each power-up, in POWERUP_TYPES order.
+def observation_arrays(nearest_blocks=8, nearest_power_ups=2, frame_size=None, batch=()):
+    arrays = {
+        "blocks": numpy.zeros(batch + (nearest_blocks, 3), dtype=numpy.float32),
+        "block_types": numpy.full(batch + (nearest_blocks,), -1, dtype=numpy.int8),
+        "power_ups": numpy.zeros(batch + (nearest_power_ups, 3), dtype=numpy.float32),
+        "power_up_types": numpy.full(batch + (nearest_power_ups,), -1, dtype=numpy.int8),
+        "basket_x": numpy.zeros(batch, dtype=numpy.float32),
+        "health": numpy.zeros(batch, dtype=numpy.float32),
+        "timers": numpy.zeros(batch + (len(POWERUP_TYPES),), dtype=numpy.float32),
+    }
+    if frame_size is not None:
+        width, height = frame_size
+        arrays["frame"] = numpy.zeros(batch + (height, width, 3), dtype=numpy.uint8)
+    return arrays
+
+
+# Write the objects nearest to the basket center into rows and types;
+# speeds are the objects' current speeds (GameState.object_speeds)
+def observe_objects(objects, speeds, center_x, center_y, rows, types):
+    n = len(objects)
+    k = min(n, len(types))
+    if k:
+        dx = (objects.x[:n] + block_size / 2 - center_x) / WIDTH
+        dy = (objects.y[:n] + block_size / 2 - center_y) / HEIGHT
+        order = numpy.argsort(dx * dx + dy * dy)[:k]
+        rows[:k, 0] = dx[order]
+        rows[:k, 1] = dy[order]
+        rows[:k, 2] = speeds[order] / block_size
+        types[:k] = objects.type_id[order]
+    rows[k:] = 0
+    types[k:] = -1
+
+
+# Draws a game into a small off-screen surface, scaled from the playfield,
+# and copies its pixels out with surfarray. Nothing touches the display, so
+# this works with no window open and never flips. pygame is imported here
+# so feature-only training does not need it.
+class FrameRenderer:
+    def __init__(self, size):
+        import pygame
+
+        self.pygame = pygame
+        self.surface = pygame.Surface(size)
+        self.scale_x = size[0] / WIDTH
+        self.scale_y = size[1] / HEIGHT
+        self.block_colors = [props["color"] for props in REGISTRY.blocks.props.values()]
+        self.power_up_colors = [props["color"] for props in REGISTRY.power_ups.props.values()]
+
+    def rect(self, x, y, width, height):
+        return (int(x * self.scale_x), int(y * self.scale_y),
+                max(1, round(width * self.scale_x)), max(1, round(height * self.scale_y)))
+
+    # Render the state and copy it into out, an (height, width, 3) array
+    def render(self, state, out):
+        draw_rect = self.pygame.draw.rect
+        surface = self.surface
+        surface.fill(BACKGROUND)
+        for objects, colors in ((state.blocks, self.block_colors), (state.power_ups, self.power_up_colors)):
+            n = len(objects)
+            for x, y, type_id in zip(objects.x[:n].tolist(), objects.y[:n].tolist(), objects.type_id[:n].tolist()):
+                draw_rect(surface, colors[type_id], self.rect(x, y, block_size, block_size))
+        for basket in state.baskets:
+            draw_rect(surface, BASKET_COLOR, self.rect(basket.x, basket.y, basket_width, basket_height))
+        # surfarray is indexed (x, y); observations are (row, column)
+        pixels = self.pygame.surfarray.pixels3d(surface)
+        out[...] = pixels.swapaxes(0, 1)
+        del pixels  # Unlock the surface
+
+
+# Reset/step wrapper around the game rules for training and evaluating AI
+# players. Actions are indices into ACTIONS; each step repeats the action for
+# frame_skip ticks. The reward is the score gained plus the health gained
+# (times health_weight), so catching bad blocks counts twice against it.
+# Observations are a dict of NumPy arrays (see observation_arrays); pass
+# frame_size=(width, height) to add a downsampled RGB frame. The arrays are
+# reused and overwritten by every step, so copy anything you keep.
+class GameEnv:
+    def __init__(self, seed=0, tick_rate=BASE_TICK_RATE, rules=None, frame_skip=1, health_weight=1.0,
+                 nearest_blocks=8, nearest_power_ups=2, frame_size=None, observation=None, seed_stride=1):
+        self.next_seed = seed
+        self.seed_stride = seed_stride
+        self.tick_rate = tick_rate
+        self.rules = rules
+        self.frame_skip = frame_skip
+        self.health_weight = health_weight
+        if observation is None:
+            observation = observation_arrays(nearest_blocks, nearest_power_ups, frame_size)
+        self.observation = observation
+        self.renderer = FrameRenderer(frame_size) if frame_size is not None else None
+        self.state = None
+
+    # Start a new game, with the given seed or the next one in sequence
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.next_seed
+        self.next_seed = seed + self.seed_stride
+        self.state = GameState(seed, tick_rate=self.tick_rate, rules=self.rules)
+        return self.observe()
+
+    # Returns (observation, reward, done, info)
+    def step(self, action):
+        state = self.state
+        inputs = ACTIONS[action]
+        score, health = state.score, state.health
+        for _ in range(self.frame_skip):
+            state.step(inputs)
+            if state.game_over:
+                break
+        reward = state.score - score + self.health_weight * (state.health - health)
+        info = {"score": state.score, "level": state.level, "tick": state.tick, "seed": state.seed}
+        return self.observe(), reward, state.game_over, info
+
+    def observe(self):
+        state = self.state
+        basket = state.baskets[0]
+        observation = self.observation
+        center_x = basket.x + basket_width / 2
+        center_y = basket.y + basket_height / 2
+        observe_objects(state.blocks, state.object_speeds(state.blocks), center_x, center_y,
+                        observation["blocks"], observation["block_types"])
+        observe_objects(state.power_ups, state.object_speeds(state.power_ups), center_x, center_y,
+                        observation["power_ups"], observation["power_up_types"])
+        observation["basket_x"][...] = basket.x / (WIDTH - basket_width)
+        observation["health"][...] = state.health / 100
+        observation["timers"][:] = basket.power_up_timers(state.tick)
+        observation["timers"] /= state.tick_rate
+        if self.renderer is not None:
+            self.renderer.render(state, observation["frame"])
+        return observation
+
+
+# N games stepped in lockstep in one process, with observations batched
+# along a leading axis. Each game writes straight into its row of the batch
+# arrays, so no per-step stacking or copying happens. A game that ends is
+# reset at once with the next seed; its step reports done=True, the final
+# score in its info, and the first observation of the new game. Game i plays
+# seeds seed + i, seed + i + num_envs, ...
+class VecGameEnv:
+    def __init__(self, num_envs, seed=0, nearest_blocks=8, nearest_power_ups=2, frame_size=None, **kwargs):
+        self.num_envs = num_envs
+        self.observation = observation_arrays(nearest_blocks, nearest_power_ups, frame_size, batch=(num_envs,))
+        self.envs = [GameEnv(seed + i, frame_size=frame_size, seed_stride=num_envs,
+                             observation={key: array[i:i + 1].reshape(array.shape[1:])
+                                          for key, array in self.observation.items()},
+                             **kwargs)
+                     for i in range(num_envs)]
+        self.rewards = numpy.zeros(num_envs, dtype=numpy.float32)
+        self.dones = numpy.zeros(num_envs, dtype=numpy.bool_)
+
+    def reset(self):
+        for env in self.envs:
+            env.reset()
+        return self.observation
+
+    # Advance every game with one action each. Returns (observations,
+    # rewards, dones, infos); the arrays are reused by the next step.
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, numpy.asarray(actions).tolist())):
+            _, reward, done, info = env.step(action)
+            if done:
+                env.reset()
+            self.rewards[i] = reward
+            self.dones[i] = done
+            infos.append(info)
+        return self.observation, self.rewards, self.dones, infos
@@ -0,0 +1,116 @@
+import pygame
+
+from render_cache import TextCache
+from simulation import (
+    WIDTH, HEIGHT, WHITE, GREEN, RED, YELLOW, level_colors, level_names, POWERUP_TYPES,
+)
+
+# Height of the HUD strip: score/health/level row plus one row per power-up
+# and player
+def hud_height(players=1):
+    return min(HEIGHT, 45 + 25 * len(POWERUP_TYPES) * players)
+
+
+# Heads-up display drawn into a cached surface. The surface is only redrawn
+# when the score, health, level or the set of running power-ups changes, or
+# at the tick where a power-up's whole-second countdown next ticks over
+# (worked out once per redraw); every other frame is a single blit. Layout is in playfield pixels
+# multiplied by the render scale; the fonts should be sized to match.
+class Hud:
+    def __init__(self, font, small_font, text_cache=None, players=1, scale=1.0):
+        self.font = font
+        self.small_font = small_font
+        self.text_cache = text_cache or TextCache()
+        self.scale = scale
+        self.surface = pygame.Surface((self.px(WIDTH), self.px(hud_height(players))), pygame.SRCALPHA)
+        self.key = None
+        self.next_change = 0  # Tick at which a countdown shown next changes
+
+    # Playfield length to render pixels
+    def px(self, length):
+        return round(length * self.scale)
+
+    # Everything the HUD shows apart from the countdowns, used to detect
+    # when it must be redrawn
+    def state_key(self, state):
+        return (state.score, state.health, state.level, state.power_up_changes)
+
+    # Redraw the HUD surface from the game state
+    def render(self, state):
+        score, health, level = state.score, state.health, state.level
+        surface = self.surface
+        text = self.text_cache.render
+        px = self.px
+        width = surface.get_width()
+        surface.fill((0, 0, 0, 0))
+
+        # Draw score with shadow effect
+        score_text = text(self.font, f"Score: {score}", WHITE)
+        pygame.draw.rect(surface, (0, 0, 0), (px(10), px(10), score_text.get_width() + px(10),
+                                              score_text.get_height() + px(5)))
+        surface.blit(score_text, (px(15), px(12)))
+
+        # Draw health bar
+        health_width = px(200)
+        health_height = px(20)
+        health_left = width - health_width - px(10)
+        pygame.draw.rect(surface, (50, 50, 50), (health_left, px(10), health_width, health_height))
+        health_color = GREEN if health > 50 else YELLOW if health > 25 else RED
+        pygame.draw.rect(surface, health_color, (health_left, px(10), health_width * (health/100), health_height))
+        pygame.draw.rect(surface, WHITE, (health_left, px(10), health_width, health_height), max(1, px(2)))
+
+        health_text = text(self.small_font, f"{health}%", WHITE)
+        surface.blit(health_text, (width - health_width//2 - health_text.get_width()//2, px(12)))
+
+        # Draw level indicator
+        level_text = text(self.font, f"Level: {level} - {level_names[level-1]}", level_colors[level-1])
+        surface.blit(level_text, (width//2 - level_text.get_width()//2, px(10)))
+
+        # Draw active power-ups, tagged with the player when there are several
+        y_offset = px(40)
+        multiplayer = len(state.baskets) > 1
+        tick, tick_rate = state.tick, state.tick_rate
+        self.next_change = float("inf")
+        for player, basket in enumerate(state.baskets, 1):
+            prefix = f"P{player} " if multiplayer else ""
+            ends = basket.power_up_ends
+            for power_type, props in POWERUP_TYPES.items():
+                if power_type not in ends:
+                    continue
+                seconds = (ends[power_type] - tick) // tick_rate
+                # The countdown shows one second less once fewer than seconds * tick_rate ticks remain
+                self.next_change = min(self.next_change, ends[power_type] - seconds * tick_rate + 1)
+                power_text = text(self.small_font, f"{prefix}{props['label']}: {seconds}s", props['color'])
+                pygame.draw.rect(surface, (0, 0, 0), (px(10), y_offset, power_text.get_width() + px(10),
+                                                      power_text.get_height() + px(5)))
+                surface.blit(power_text, (px(15), y_offset))
+                y_offset += px(25)
+
+    # Redraw the HUD surface if anything it shows has changed; returns
+    # whether it was redrawn
+    def update(self, state):
+        key = self.state_key(state)
+        if key == self.key and state.tick < self.next_change:
+            return False
+        self.render(state)
+        self.key = key
+        return True
+
+    # Blit the HUD, redrawing it first if anything it shows has changed
+    def draw(self, target, state):
+        self.update(state)
+        target.blit(self.surface, (0, 0))
+
+    # Single rect covering every part of the HUD overlapped by the given
+    # screen rects, or None. The HUD is translucent, so it must be blitted
+    # over each pixel exactly once per repaint.
+    def overlap(self, rects):
+        hud_rect = self.surface.get_rect()
+        clips = [hud_rect.clip(rect) for rect in rects if hud_rect.colliderect(rect)]
+        if not clips:
+            return None
+        return clips[0].unionall(clips[1:])
+
+    # Blit only the part of the HUD inside a screen rect
+    def draw_clipped(self, target, rect):
+        target.blit(self.surface, rect, rect)
@@ -1,579 +1,559 @@
-import pygame
+import time
+
+startup_start = time.perf_counter()
+
+import argparse
+import gc
+import math
+import os
 import random
 import sys
-import math
-import os, numpy
-
-# Initialize pygame
-pygame.init()
-pygame.mixer.init()
-
-# Screen dimensions
-WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Falling Blocks Catcher - Enhanced Edition")
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0)
-PURPLE = (128, 0, 128)
-ORANGE = (255, 165, 0)
-CYAN = (0, 255, 255)
-PINK = (255, 192, 203)
-
-# Game variables
-basket_width = 100
-basket_height = 20
-basket_x = WIDTH // 2 - basket_width // 2
-basket_y = HEIGHT - 30
-basket_speed = 8
-
-block_size = 30
-blocks = []
-power_ups = []
-block_speed = 3
-block_spawn_rate = 30  # Lower is faster
-
-score = 0
+
+import pygame
+
+from audio import SoundManager
+from bots import greedy_bot
+from dirty_rects import DirtyRectTracker, object_rects
+from hud import Hud
+from particles import ParticlePool
+from profiler import FrameProfiler, StartupTimer
+from replay import MAX_PLAYERS, ReplayRecorder, input_bits, players_bits
+from scores import ScoreStore
+from telemetry import TelemetryPublisher
+from viewport import Viewport, parse_size
+from render_cache import BackgroundCache, SpriteAtlas, SurfaceCache, TextCache, pulse_bucket
+from simulation import (
+    WHITE, BLACK, RED, GREEN, BLUE, YELLOW, PURPLE, ORANGE, CYAN, PINK,
+    basket_width, basket_height, block_size,
+    level_colors, level_names,
+    GameState, Inputs, REGISTRY,
+)
+
+# Importing this module has no side effects: the window, fonts and HUD are
+# created by init(), and the mixer only after the first frame is on screen
+# (start_audio()), so the game's functions can be imported and driven by
+# tools without opening a window.
+startup = StartupTimer(startup_start)
+startup.mark("imports")
+
+screen = None
+clock = None
+viewport = None
+font = None
+small_font = None
+hud = None
+sounds = None
+
+# Finished sessions are logged to a persistent score store, which also
+# provides the high score
+scores = None
 high_score = 0
-health = 100
-level = 1
-level_thresholds = [0, 500, 1000, 2000, 5000]  # Score thresholds for levels
-level_colors = [BLUE, GREEN, PURPLE, ORANGE, RED]
-level_names = ["Beginner", "Intermediate", "Advanced", "Expert", "Master"]
-
-# Power-up types and their durations (in frames)
-POWERUP_TYPES = {
-    "slow_motion": {"duration": 300, "color": CYAN, "name": "Slow Motion"},
-    "double_points": {"duration": 450, "color": YELLOW, "name": "Double Points"},
-    "magnet": {"duration": 600, "color": PINK, "name": "Magnet"},
-    "shield": {"duration": 500, "color": PURPLE, "name": "Shield"}
-}
-
-active_power_ups = {key: 0 for key in POWERUP_TYPES.keys()}  # Track active power-ups
-
-# Block types with their properties
-BLOCK_TYPES = {
-    "good": {"points": 10, "color": GREEN, "spawn_chance": 60},
-    "bad": {"points": -10, "color": RED, "spawn_chance": 25, "damage": 10},
-    "special": {"points": 20, "color": YELLOW, "spawn_chance": 10, "heal": 5},
-    "bonus": {"points": 50, "color": ORANGE, "spawn_chance": 4, "heal": 10},
-    "bomb": {"points": -30, "color": BLACK, "spawn_chance": 1, "damage": 20}
-}
-
-game_over = False
-game_paused = False
-clock = pygame.time.Clock()
-font = pygame.font.SysFont(None, 36)
-small_font = pygame.font.SysFont(None, 24)
-
-# Sound initialization
-has_sound = False
-catch_sound = None
-damage_sound = None
-powerup_sound = None
-level_up_sound = None
-
-# Try to load sound files
-try:
-    # Create silent sounds as fallback
-    silent_array = numpy.zeros((44100, 2), dtype=numpy.int16)  # 1 second of silence, stereo
-    catch_sound = pygame.sndarray.make_sound(silent_array)
-    damage_sound = pygame.sndarray.make_sound(silent_array)
-    powerup_sound = pygame.sndarray.make_sound(silent_array)
-    level_up_sound = pygame.sndarray.make_sound(silent_array)
-    
-    # Try to load actual sound files if they exist
-    sound_files = {
-        "catch.wav": catch_sound,
-        "damage.wav": damage_sound,
-        "powerup.wav": powerup_sound,
-        "level_up.wav": level_up_sound
-    }
-    
-    for file_name, sound_obj in sound_files.items():
-        if os.path.exists(file_name):
-            sound_files[file_name] = pygame.mixer.Sound(file_name)
-    
-    catch_sound, damage_sound, powerup_sound, level_up_sound = sound_files.values()
-    has_sound = True
-except Exception as e:
-    print(f"Sound initialization error: {e}")
-    has_sound = False
 
-# Particle system for visual effects
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(2, 6)
-        self.speed_x = random.uniform(-3, 3)
-        self.speed_y = random.uniform(-3, 3)
-        self.life = random.randint(20, 40)
-    
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.life -= 1
-        self.size = max(0, self.size - 0.1)
-        return self.life <= 0
-    
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), int(self.size))
+# Per-tick state published to --telemetry subscribers, or None
+telemetry = None
+
+background_cache = BackgroundCache()
+sprite_atlas = SpriteAtlas()
+text_cache = TextCache()
+pause_overlay = SurfaceCache()
+game_over_overlay = SurfaceCache()
+shield_glow = SurfaceCache()
+
+# The game draws into a canvas of the playfield size times render_scale
+# (screen), which the viewport scales to the display once per frame. Drawing
+# code works in playfield coordinates and multiplies by render_scale; cached
+# surfaces are keyed by the size they were rasterized at.
+render_scale = 1.0
+
+# Optional dirty-rectangle rendering: only the parts of the screen that
+# changed are repainted and pushed to the display
+dirty_rendering = False
+dirty_tracker = DirtyRectTracker()
+
+# Optional replay recording: every finished game is written to this directory
+record_dir = None
+
+# Frame-time profiler: F3 toggles the overlay, --profile-out streams a
+# per-frame CSV (or NDJSON for .ndjson paths) trace. Created by init(), as
+# it hooks the garbage collector.
+profiler = None
+
+# Simulation and render rates: the game advances in fixed ticks of
+# 1/tick_rate seconds, while frames are drawn at up to render_fps with object
+# positions interpolated between ticks
+tick_rate = 60
+render_fps = 60
+max_frame_time = 0.25  # Longest stretch of wall time simulated in one frame
+
+# Local multiplayer: human players use the key pairs below in order, AI
+# baskets fill the remaining slots
+KEY_SPLITS = [
+    (pygame.K_LEFT, pygame.K_RIGHT),
+    (pygame.K_a, pygame.K_d),
+    (pygame.K_j, pygame.K_l),
+    (pygame.K_KP4, pygame.K_KP6),
+]
+PLAYER_COLORS = [BLUE, ORANGE, GREEN, PINK, CYAN, YELLOW, WHITE]
+human_players = 1
+ai_players = 0
+
+# Render-only randomness (bomb flicker), reseeded per game so replays look the same
+render_rng = random.Random()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Falling Blocks Catcher")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="repaint and present only the parts of the screen that changed")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every finished game in DIR")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="stream per-frame phase timings to a CSV (or .ndjson) file")
+    parser.add_argument("--profile-alloc", action="store_true",
+                        help="also record each frame's peak allocation with tracemalloc (slow)")
+    parser.add_argument("--tick-rate", type=int, default=60, help="simulation ticks per second")
+    parser.add_argument("--fps", type=int, default=60, help="maximum frames drawn per second")
+    parser.add_argument("--players", type=int, default=1, choices=range(1, len(KEY_SPLITS) + 1),
+                        help="human players: arrows, A/D, J/L, keypad 4/6")
+    parser.add_argument("--ai", type=int, default=0, metavar="N", help="AI-controlled baskets to add")
+    parser.add_argument("--scores", metavar="PATH", default="scores.db",
+                        help="SQLite database of finished sessions (default: scores.db)")
+    parser.add_argument("--telemetry", metavar="ADDRESS", action="append", default=[],
+                        help="publish per-tick state to HOST:PORT (UDP) or a Unix socket path; repeatable")
+    parser.add_argument("--display", metavar="WxH", type=parse_size,
+                        help="window size; the game is scaled to fit (default: the render size)")
+    parser.add_argument("--fullscreen", action="store_true",
+                        help="fill the screen (at the desktop resolution unless --display is given)")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="draw at the 800x600 playfield size times this, then scale to the display")
+    parser.add_argument("--gpu-scaling", action="store_true",
+                        help="let SDL scale the frame to the display (pygame.SCALED) instead of the CPU")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each startup phase took after the first frame, then exit")
+    args = parser.parse_args(argv)
+    if not 0 <= args.ai <= MAX_PLAYERS - args.players:
+        parser.error(f"at most {MAX_PLAYERS} baskets in total")
+    if not 0.25 <= args.render_scale <= 8:
+        parser.error("--render-scale must be between 0.25 and 8")
+    return args
+
+
+# Apply command line options and create the window, fonts and HUD
+def init(args):
+    global screen, clock, viewport, font, small_font, hud, scores, high_score, telemetry, profiler
+    global dirty_rendering, record_dir, tick_rate, render_fps, human_players, ai_players, render_scale
+    dirty_rendering = args.dirty_rects
+    record_dir = args.record
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+    tick_rate = args.tick_rate
+    render_fps = args.fps
+    human_players = args.players
+    ai_players = args.ai
+    render_scale = args.render_scale
+    profiler = FrameProfiler(trace_path=args.profile_out, track_allocations=args.profile_alloc)
+
+    # Only the subsystems the game uses, rather than everything pygame.init() starts
+    pygame.display.init()
+    viewport = Viewport(render_scale, args.display, args.fullscreen, args.gpu_scaling)
+    screen = viewport.open()
+    pygame.display.set_caption("Falling Blocks Catcher - Enhanced Edition")
+    clock = pygame.time.Clock()
+    startup.mark("display")
+
+    pygame.font.init()
+    font = pygame.font.SysFont(None, round(36 * render_scale))
+    small_font = pygame.font.SysFont(None, round(24 * render_scale))
+    hud = Hud(font, small_font, text_cache, human_players + ai_players, render_scale)
+    startup.mark("fonts")
+
+    scores = ScoreStore(args.scores)
+    high_score = scores.best()
+    startup.mark("scores")
+
+    if args.telemetry:
+        telemetry = TelemetryPublisher(args.telemetry)
+
+
+# Open the mixer and start loading sound effects in the background. Until
+# this runs, sound events are ignored.
+def start_audio():
+    global sounds
+    try:
+        pygame.mixer.init()
+    except pygame.error as e:
+        print(f"Sound initialization error: {e}")
+    sounds = SoundManager()
+    sounds.load_async()
+    startup.mark("audio")
+
+# Play a named sound effect emitted by the simulation
+def play_sound(name):
+    if sounds is not None:
+        sounds.play(name)
 
-particles = []
+# Particle system for visual effects
+particles = ParticlePool()
 
 def create_particles(x, y, color, count=10):
-    for _ in range(count):
-        particles.append(Particle(x, y, color))
+    particles.emit(x, y, color, count)
 
-def update_particles():
-    global particles
-    particles = [p for p in particles if not p.update()]
+def update_particles(dt=1.0):
+    particles.update(dt)
 
 def draw_particles(surface):
-    for p in particles:
-        p.draw(surface)
+    particles.draw(surface, render_scale)
 
 # Draw a gradient background based on level
-def draw_background():
-    color = level_colors[level - 1]
-    for y in range(HEIGHT):
-        # Calculate gradient intensity
-        intensity = 0.3 + 0.7 * (y / HEIGHT)
-        r = min(255, int(color[0] * intensity))
-        g = min(255, int(color[1] * intensity))
-        b = min(255, int(color[2] * intensity))
-        pygame.draw.line(screen, (r, g, b), (0, y), (WIDTH, y))
-
-# Draw the basket with visual effects
-def draw_basket():
-    color = BLUE
-    if active_power_ups["shield"] > 0:
+def draw_background(level):
+    screen.blit(background_cache.get(level, screen.get_size()), (0, 0))
+
+# Build the translucent shield circle drawn around the basket
+def build_shield_glow():
+    shield_radius = basket_width * 0.7 * render_scale
+    shield_surface = pygame.Surface((shield_radius*2, shield_radius*2), pygame.SRCALPHA)
+    pygame.draw.circle(shield_surface, (PURPLE[0], PURPLE[1], PURPLE[2], 100), 
+                      (int(shield_radius), int(shield_radius)), int(shield_radius))
+    return shield_surface
+
+# Draw every player's basket with visual effects
+def draw_basket(state, alpha=1.0):
+    for player, basket in enumerate(state.baskets):
+        draw_one_basket(basket, alpha, PLAYER_COLORS[player % len(PLAYER_COLORS)])
+
+def draw_one_basket(basket, alpha, base_color):
+    scale = render_scale
+    basket_x, basket_y = basket.x_at(alpha) * scale, basket.y * scale
+    width, height = basket_width * scale, basket_height * scale
+    line = max(1, round(2 * scale))
+    color = base_color
+    if "shield" in basket.power_up_ends:
         # Pulsing effect for shield
         pulse = (math.sin(pygame.time.get_ticks() * 0.01) + 1) * 50
-        color = (min(255, BLUE[0] + pulse), min(255, BLUE[1] + pulse), BLUE[2])
+        color = (min(255, base_color[0] + pulse), min(255, base_color[1] + pulse), base_color[2])
         
         # Draw shield glow
-        shield_radius = basket_width * 0.7
-        shield_surface = pygame.Surface((shield_radius*2, shield_radius*2), pygame.SRCALPHA)
-        pygame.draw.circle(shield_surface, (PURPLE[0], PURPLE[1], PURPLE[2], 100), 
-                          (int(shield_radius), int(shield_radius)), int(shield_radius))
-        screen.blit(shield_surface, (basket_x + basket_width/2 - shield_radius, 
-                                    basket_y + basket_height/2 - shield_radius))
+        shield_radius = basket_width * 0.7 * scale
+        screen.blit(shield_glow.get(scale, build_shield_glow), (basket_x + width/2 - shield_radius,
+                                                               basket_y + height/2 - shield_radius))
     
-    pygame.draw.rect(screen, tuple(map(int, color)), (basket_x, basket_y, basket_width, basket_height))
+    pygame.draw.rect(screen, tuple(map(int, color)), (basket_x, basket_y, width, height))
     
     # Draw basket details
-    pygame.draw.rect(screen, BLACK, (basket_x, basket_y, basket_width, basket_height), 2)
+    pygame.draw.rect(screen, BLACK, (basket_x, basket_y, width, height), line)
     for i in range(1, 4):
         pygame.draw.line(screen, BLACK, 
-                        (basket_x + i * basket_width/4, basket_y),
-                        (basket_x + i * basket_width/4, basket_y + basket_height), 2)
+                        (basket_x + i * width/4, basket_y),
+                        (basket_x + i * width/4, basket_y + height), line)
 
-# Draw blocks with visual effects
-def draw_block(x, y, block_type):
-    props = BLOCK_TYPES[block_type]
-    color = props["color"]
-    
-    # Special effects for certain blocks
-    if block_type == "bonus":
-        # Pulsing effect for bonus blocks
-        pulse = (math.sin(pygame.time.get_ticks() * 0.02) + 1) * 40
-        color = (min(255, color[0] + pulse), min(255, color[1] + pulse), color[2])
-    elif block_type == "bomb":
-        # Flickering effect for bomb blocks
-        if random.random() > 0.7:
-            color = RED
-    
-    pygame.draw.rect(screen, color, (x, y, block_size, block_size))
-    pygame.draw.rect(screen, BLACK, (x, y, block_size, block_size), 2)
-    
-    # Add special markings based on block type
-    if block_type == "good":
-        pygame.draw.circle(screen, WHITE, (x + block_size//2, y + block_size//2), block_size//4)
-    elif block_type == "bad":
-        pygame.draw.line(screen, WHITE, (x + 5, y + 5), (x + block_size - 5, y + block_size - 5), 2)
-        pygame.draw.line(screen, WHITE, (x + block_size - 5, y + 5), (x + 5, y + block_size - 5), 2)
-    elif block_type == "special":
-        pygame.draw.polygon(screen, WHITE, [(x + block_size//2, y + 5),
-                                          (x + block_size - 5, y + block_size - 5),
-                                          (x + 5, y + block_size - 5)])
-    elif block_type == "bonus":
-        pygame.draw.rect(screen, WHITE, (x + block_size//4, y + block_size//4, 
-                                        block_size//2, block_size//2))
-    elif block_type == "bomb":
-        pygame.draw.circle(screen, RED, (x + block_size//2, y + block_size//2), block_size//3)
-
-# Draw power-ups with visual effects
-def draw_power_up(x, y, power_type):
-    props = POWERUP_TYPES[power_type]
-    color = props["color"]
+# Sprite variant for each block effect in object_types.json, given the
+# current pulse phase
+def pulse_variant(phase):
+    return phase
+
+def flicker_variant(phase):
+    return 1 if render_rng.random() > 0.7 else 0
+
+def no_variant(phase):
+    return 0
+
+EFFECT_VARIANTS = {"pulse": pulse_variant, "flicker": flicker_variant, None: no_variant}
+
+# Draw all blocks and power-ups in one batched blit from the sprite atlas
+def draw_falling_objects(state, alpha=1.0):
+    ticks = pygame.time.get_ticks()
+    bonus_phase = pulse_bucket(ticks, 0.02)
+    power_up_phase = pulse_bucket(ticks, 0.03)
     
-    # Pulsing effect for power-ups
-    pulse = (math.sin(pygame.time.get_ticks() * 0.03) + 1) * 30
-    color = (min(255, color[0] + pulse), min(255, color[1] + pulse), min(255, color[2] + pulse))
+    scale = render_scale
+    size = round(block_size * scale)
+    sprites = []
+    block_types = REGISTRY.blocks.props
+    for x, y, block_type in state.blocks.items(alpha):
+        variant = EFFECT_VARIANTS[block_types[block_type].get("effect")](bonus_phase)
+        sprites.append((sprite_atlas.block(block_type, variant, size), (x * scale, y * scale)))
     
-    pygame.draw.rect(screen, color, (x, y, block_size, block_size))
-    pygame.draw.rect(screen, BLACK, (x, y, block_size, block_size), 2)
+    for x, y, power_type in state.power_ups.items(alpha):
+        sprites.append((sprite_atlas.power_up(power_type, power_up_phase, size), (x * scale, y * scale)))
     
-    # Add special markings based on power-up type
-    if power_type == "slow_motion":
-        pygame.draw.circle(screen, WHITE, (x + block_size//2, y + block_size//2), block_size//3, 2)
-        pygame.draw.line(screen, WHITE, (x + block_size//2, y + block_size//3),
-                        (x + block_size//2, y + 2*block_size//3), 2)
-    elif power_type == "double_points":
-        pygame.draw.line(screen, WHITE, (x + block_size//3, y + block_size//3),
-                        (x + 2*block_size//3, y + 2*block_size//3), 2)
-        pygame.draw.line(screen, WHITE, (x + 2*block_size//3, y + block_size//3),
-                        (x + block_size//3, y + 2*block_size//3), 2)
-    elif power_type == "magnet":
-        pygame.draw.arc(screen, WHITE, (x + 5, y + 5, block_size - 10, block_size - 10), 
-                        math.pi/4, 7*math.pi/4, 2)
-    elif power_type == "shield":
-        pygame.draw.circle(screen, WHITE, (x + block_size//2, y + block_size//2), block_size//3, 2)
+    screen.blits(sprites, doreturn=False)
 
 # Draw the UI with visual improvements
-def draw_ui():
-    # Draw score with shadow effect
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    pygame.draw.rect(screen, (0, 0, 0, 100), (10, 10, score_text.get_width() + 10, score_text.get_height() + 5))
-    screen.blit(score_text, (15, 12))
-    
-    # Draw health bar
-    health_width = 200
-    health_height = 20
-    pygame.draw.rect(screen, (50, 50, 50), (WIDTH - health_width - 10, 10, health_width, health_height))
-    health_color = GREEN if health > 50 else YELLOW if health > 25 else RED
-    pygame.draw.rect(screen, health_color, (WIDTH - health_width - 10, 10, health_width * (health/100), health_height))
-    pygame.draw.rect(screen, WHITE, (WIDTH - health_width - 10, 10, health_width, health_height), 2)
-    
-    health_text = small_font.render(f"{health}%", True, WHITE)
-    screen.blit(health_text, (WIDTH - health_width//2 - health_text.get_width()//2, 12))
-    
-    # Draw level indicator
-    level_text = font.render(f"Level: {level} - {level_names[level-1]}", True, level_colors[level-1])
-    screen.blit(level_text, (WIDTH//2 - level_text.get_width()//2, 10))
-    
-    # Draw active power-ups
-    y_offset = 40
-    for power_type, duration in active_power_ups.items():
-        if duration > 0:
-            props = POWERUP_TYPES[power_type]
-            power_text = small_font.render(f"{props['name']}: {duration//60}s", True, props['color'])
-            pygame.draw.rect(screen, (0, 0, 0, 100), (10, y_offset, power_text.get_width() + 10, power_text.get_height() + 5))
-            screen.blit(power_text, (15, y_offset))
-            y_offset += 25
-
-# Spawn a new block based on probabilities
-def spawn_block():
-    total_chance = sum(BLOCK_TYPES[bt]["spawn_chance"] for bt in BLOCK_TYPES)
-    rand = random.randint(1, total_chance)
-    current = 0
-    
-    for block_type, props in BLOCK_TYPES.items():
-        current += props["spawn_chance"]
-        if rand <= current:
-            return {
-                "x": random.randint(0, WIDTH - block_size),
-                "y": 0,
-                "type": block_type,
-                "speed": block_speed * (0.8 + 0.4 * random.random())  # Randomize speed slightly
-            }
-    
-    return None
-
-# Spawn a power-up with a low probability
-def spawn_power_up():
-    if random.random() < 0.01:  # 1% chance per frame to spawn a power-up
-        power_type = random.choice(list(POWERUP_TYPES.keys()))
-        return {
-            "x": random.randint(0, WIDTH - block_size),
-            "y": 0,
-            "type": power_type,
-            "speed": block_speed * 0.8  # Power-ups fall slightly slower
-        }
-    return None
-
-# Apply a power-up effect
-def apply_power_up(power_type):
-    active_power_ups[power_type] = POWERUP_TYPES[power_type]["duration"]
-    if has_sound and powerup_sound is not None:
-        try:
-            powerup_sound.play()
-        except:
-            pass
-
-# Update active power-ups and their effects
-def update_power_ups():
-    global block_speed, score
-    
-    # Decrement all active power-ups
-    for power_type in active_power_ups:
-        if active_power_ups[power_type] > 0:
-            active_power_ups[power_type] -= 1
-    
-    # Apply power-up effects
-    if active_power_ups["slow_motion"] > 0:
-        # Slow down all blocks
-        for block in blocks:
-            block["speed"] = block_speed * 0.5
-    else:
-        # Reset block speeds
-        for block in blocks:
-            block["speed"] = block_speed
+def draw_ui(state):
+    hud.draw(screen, state)
 
-# Check for level up
-def check_level_up():
-    global level, block_speed, block_spawn_rate
-    
-    for i, threshold in enumerate(level_thresholds):
-        if score >= threshold and i + 1 > level:
-            level = i + 1
-            block_speed = 3 + level  # Increase speed with level
-            block_spawn_rate = max(5, 30 - level * 3)  # Increase spawn rate with level
-            
-            # Create level up particles
-            for _ in range(100):
-                create_particles(WIDTH//2, HEIGHT//2, level_colors[level-1])
-            
-            if has_sound and level_up_sound is not None:
-                try:
-                    level_up_sound.play()
-                except:
-                    pass
-            return True
-    return False
+# Build the game over overlay
+def build_game_over(state):
+    score, level = state.score, state.level
+    overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 180))
+    center_x, center_y = overlay.get_width() // 2, overlay.get_height() // 2
+    row = round(50 * render_scale)
+    
+    game_over_text = text_cache.render(font, "GAME OVER", RED)
+    final_score_text = text_cache.render(font, f"Final Score: {score}", WHITE)
+    high_score_text = text_cache.render(font, f"High Score: {high_score}", YELLOW)
+    level_text = text_cache.render(font, f"Reached Level: {level} - {level_names[level-1]}", level_colors[level-1])
+    restart_text = text_cache.render(font, "Press R to restart or Q to quit", WHITE)
+    
+    overlay.blit(game_over_text, (center_x - game_over_text.get_width() // 2, center_y - 2 * row))
+    overlay.blit(final_score_text, (center_x - final_score_text.get_width() // 2, center_y - row))
+    overlay.blit(high_score_text, (center_x - high_score_text.get_width() // 2, center_y))
+    overlay.blit(level_text, (center_x - level_text.get_width() // 2, center_y + row))
+    overlay.blit(restart_text, (center_x - restart_text.get_width() // 2, center_y + 2 * row))
+    return overlay
 
 # Draw the game over screen
-def draw_game_over():
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))
-    screen.blit(overlay, (0, 0))
+def draw_game_over(state):
+    key = (state.score, high_score, state.level, screen.get_size())
+    screen.blit(game_over_overlay.get(key, lambda: build_game_over(state)), (0, 0))
+
+# Build the pause overlay
+def build_pause_screen():
+    overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 120))
+    center_x, center_y = overlay.get_width() // 2, overlay.get_height() // 2
+    row = round(50 * render_scale)
     
-    game_over_text = font.render("GAME OVER", True, RED)
-    final_score_text = font.render(f"Final Score: {score}", True, WHITE)
-    high_score_text = font.render(f"High Score: {high_score}", True, YELLOW)
-    level_text = font.render(f"Reached Level: {level} - {level_names[level-1]}", True, level_colors[level-1])
-    restart_text = font.render("Press R to restart or Q to quit", True, WHITE)
+    pause_text = text_cache.render(font, "GAME PAUSED", YELLOW)
+    continue_text = text_cache.render(font, "Press P to continue", WHITE)
     
-    screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 100))
-    screen.blit(final_score_text, (WIDTH // 2 - final_score_text.get_width() // 2, HEIGHT // 2 - 50))
-    screen.blit(high_score_text, (WIDTH // 2 - high_score_text.get_width() // 2, HEIGHT // 2))
-    screen.blit(level_text, (WIDTH // 2 - level_text.get_width() // 2, HEIGHT // 2 + 50))
-    screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 100))
+    overlay.blit(pause_text, (center_x - pause_text.get_width() // 2, center_y - row))
+    overlay.blit(continue_text, (center_x - continue_text.get_width() // 2, center_y + row))
+    return overlay
 
 # Draw the pause screen
 def draw_pause_screen():
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 120))
-    screen.blit(overlay, (0, 0))
-    
-    pause_text = font.render("GAME PAUSED", True, YELLOW)
-    continue_text = font.render("Press P to continue", True, WHITE)
-    
-    screen.blit(pause_text, (WIDTH // 2 - pause_text.get_width() // 2, HEIGHT // 2 - 50))
-    screen.blit(continue_text, (WIDTH // 2 - continue_text.get_width() // 2, HEIGHT // 2 + 50))
-
-# Main game loop
-while not game_over:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            game_over = True
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_p:
-                game_paused = not game_paused
-            elif event.key == pygame.K_q and game_paused:
-                game_over = True
-    
-    if game_paused:
-        draw_pause_screen()
-        pygame.display.flip()
-        clock.tick(60)
-        continue
-    
-    # Move basket with arrow keys
-    keys = pygame.key.get_pressed()
-    if keys[pygame.K_LEFT] and basket_x > 0:
-        basket_x -= basket_speed
-    if keys[pygame.K_RIGHT] and basket_x < WIDTH - basket_width:
-        basket_x += basket_speed
-    
-    # Apply magnet effect if active
-    if active_power_ups["magnet"] > 0:
-        magnet_radius = 150
-        for block in blocks:
-            block_center_x = block["x"] + block_size/2
-            block_center_y = block["y"] + block_size/2
-            basket_center_x = basket_x + basket_width/2
-            basket_center_y = basket_y + basket_height/2
-            
-            distance = math.sqrt((block_center_x - basket_center_x)**2 + 
-                                (block_center_y - basket_center_y)**2)
-            
-            if distance < magnet_radius:
-                # Move block toward basket
-                angle = math.atan2(basket_center_y - block_center_y, 
-                                  basket_center_x - block_center_x)
-                block["x"] += math.cos(angle) * 5
-                block["y"] += math.sin(angle) * 5
-    
-    # Spawn new blocks
-    if random.randint(1, block_spawn_rate) == 1:
-        new_block = spawn_block()
-        if new_block:
-            blocks.append(new_block)
-    
-    # Spawn power-ups
-    new_power_up = spawn_power_up()
-    if new_power_up:
-        power_ups.append(new_power_up)
-    
-    # Move blocks and check for collisions
-    for block in blocks[:]:
-        block["y"] += block["speed"]
-        
-        # Check if block is caught by basket
-        if (basket_y < block["y"] + block_size and
-            basket_y + basket_height > block["y"] and
-            basket_x < block["x"] + block_size and
-            basket_x + basket_width > block["x"]):
-            
-            block_type = block["type"]
-            props = BLOCK_TYPES[block_type]
-            
-            # Apply shield protection
-            if active_power_ups["shield"] > 0 and props["points"] < 0:
-                # Block is harmful but shield is active
-                score += 5  # Small bonus for deflecting
-                create_particles(block["x"] + block_size/2, block["y"] + block_size/2, PURPLE, 20)
-            else:
-                # Normal block handling
-                points = props["points"]
-                if active_power_ups["double_points"] > 0 and points > 0:
-                    points *= 2
-                
-                score += points
-                
-                # Handle health changes
-                if "damage" in props:
-                    health -= props["damage"]
-                if "heal" in props:
-                    health = min(100, health + props["heal"])
-                
-                # Create particles based on block type
-                create_particles(block["x"] + block_size/2, block["y"] + block_size/2, props["color"], 15)
-                
-                # Play sound
-                if has_sound:
-                    try:
-                        if points > 0:
-                            if catch_sound is not None:
-                                catch_sound.play()
-                        else:
-                            if damage_sound is not None:
-                                damage_sound.play()
-                    except:
-                        pass
-            
-            blocks.remove(block)
-        
-        # Remove blocks that fall off the screen
-        elif block["y"] > HEIGHT:
-            blocks.remove(block)
-    
-    # Move power-ups and check for collisions
-    for power_up in power_ups[:]:
-        power_up["y"] += power_up["speed"]
-        
-        # Check if power-up is caught by basket
-        if (basket_y < power_up["y"] + block_size and
-            basket_y + basket_height > power_up["y"] and
-            basket_x < power_up["x"] + block_size and
-            basket_x + basket_width > power_up["x"]):
-            
-            apply_power_up(power_up["type"])
-            create_particles(power_up["x"] + block_size/2, power_up["y"] + block_size/2, 
-                            POWERUP_TYPES[power_up["type"]]["color"], 20)
-            power_ups.remove(power_up)
-        
-        # Remove power-ups that fall off the screen
-        elif power_up["y"] > HEIGHT:
-            power_ups.remove(power_up)
-    
-    # Update power-ups
-    update_power_ups()
-    
-    # Check for level up
-    check_level_up()
-    
-    # Update particles
-    update_particles()
-    
-    # Check for game over
-    if health <= 0:
-        game_over = True
-        high_score = max(high_score, score)
-    
-    # Draw everything
-    draw_background()
+    screen.blit(pause_overlay.get(("paused", screen.get_size()), build_pause_screen), (0, 0))
+
+
+# Turn simulation events into particles and sounds
+def handle_events(events):
+    for event in events:
+        if event[0] == "particles":
+            _, x, y, color, count = event
+            create_particles(x, y, color, count)
+        elif event[0] == "sound":
+            play_sound(event[1])
+
+# Draw one frame of gameplay; alpha is how far rendering is between the last
+# two simulation ticks
+def draw_game(state, alpha=1.0):
+    draw_background(state.level)
+    profiler.lap("draw_background")
     
     # Draw particles
     draw_particles(screen)
+    profiler.lap("draw_particles")
     
-    # Draw blocks
-    for block in blocks:
-        draw_block(block["x"], block["y"], block["type"])
-    
-    # Draw power-ups
-    for power_up in power_ups:
-        draw_power_up(power_up["x"], power_up["y"], power_up["type"])
+    # Draw blocks and power-ups
+    draw_falling_objects(state, alpha)
+    profiler.lap("draw_objects")
     
     # Draw basket
-    draw_basket()
+    draw_basket(state, alpha)
+    profiler.lap("draw_basket")
     
     # Draw UI
-    draw_ui()
-    
-    pygame.display.flip()
-    clock.tick(60)
-
-# Game over screen
-while game_over:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r:
-                # Restart game by resetting variables
-                blocks = []
-                power_ups = []
-                score = 0
-                health = 100
-                level = 1
-                block_speed = 3
-                block_spawn_rate = 30
-                active_power_ups = {key: 0 for key in POWERUP_TYPES.keys()}
-                particles = []
-                game_over = False
-            elif event.key == pygame.K_q:
-                pygame.quit()
-                sys.exit()
-    
-    draw_game_over()
-    pygame.display.flip()
-    clock.tick(60)
-
-# Continue the game loop if restarted
-if not game_over:
-    # Reset the main game loop (this would need to be restructured for a proper game loop)
-    pass
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    draw_ui(state)
+    profiler.lap("draw_ui")
+
+# Draw one frame of gameplay, repainting only what changed since the last
+# frame. Returns the screen rects that need to be presented.
+def draw_game_dirty(state, alpha=1.0):
+    rects = object_rects(state, particles.bounds(render_scale), alpha, render_scale)
+    if dirty_tracker.enter_scene(("play", state.level, screen.get_size())):
+        draw_game(state, alpha)
+        dirty_tracker.reset(rects)
+        return [screen.get_rect()]
+    
+    dirty = dirty_tracker.collect(rects)
+    if hud.update(state):
+        dirty.append(hud.surface.get_rect())
+    hud_rect = hud.overlap(dirty)
+    if hud_rect:
+        dirty.append(hud_rect)
+    
+    # Restore the background under everything that moved, then redraw on top
+    background = background_cache.get(state.level, screen.get_size())
+    for rect in dirty:
+        screen.blit(background, rect, rect)
+    profiler.lap("draw_background")
+    draw_particles(screen)
+    profiler.lap("draw_particles")
+    draw_falling_objects(state, alpha)
+    profiler.lap("draw_objects")
+    draw_basket(state, alpha)
+    profiler.lap("draw_basket")
+    if hud_rect:
+        hud.draw_clipped(screen, hud_rect)
+    profiler.lap("draw_ui")
+    return dirty
+
+# Draw a static overlay screen once; later frames present nothing
+def draw_overlay_dirty(scene, draw):
+    if dirty_tracker.enter_scene(scene):
+        draw()
+        return [screen.get_rect()]
+    return []
+
+# Draw and present one frame
+def present_frame(state, game_paused, alpha=1.0):
+    if not dirty_rendering:
+        if state.game_over:
+            draw_game_over(state)
+            profiler.lap("draw_overlay")
+        elif game_paused:
+            draw_pause_screen()
+            profiler.lap("draw_overlay")
+        else:
+            draw_game(state, alpha)
+        if profiler.visible:
+            profiler.draw(screen, small_font)
+            profiler.lap("draw_overlay")
+        viewport.present()
+        profiler.lap("flip")
+        return
+    
+    if state.game_over:
+        rects = draw_overlay_dirty(("game_over", state.score, high_score, state.level),
+                                   lambda: draw_game_over(state))
+        profiler.lap("draw_overlay")
+    elif game_paused:
+        rects = draw_overlay_dirty(("paused",), draw_pause_screen)
+        profiler.lap("draw_overlay")
+    else:
+        rects = draw_game_dirty(state, alpha)
+    if profiler.visible:
+        rects.append(profiler.draw(screen, small_font))
+        profiler.lap("draw_overlay")
+    viewport.present(rects)
+    profiler.lap("flip")
+
+# Start a new game with fresh, seeded random streams
+def new_game():
+    state = GameState(tick_rate=tick_rate, players=human_players + ai_players)
+    state.lap = profiler.lap
+    particles.clear(state.seed)
+    render_rng.seed(state.seed)
+    return state, ReplayRecorder(state.seed, state.tick_rate, len(state.baskets))
+
+# Save a game's replay, when recording is on
+def save_replay(state, recorder):
+    if record_dir is not None:
+        recorder.save(os.path.join(record_dir, f"replay-{state.seed}.fbr"))
+
+# Finish a game: log it, update the high score and save its replay
+def end_game(state, recorder):
+    global high_score
+    state.game_over = True
+    high_score = max(high_score, state.score)
+    scores.record(state)
+    save_replay(state, recorder)
+
+# Quit the game. A game still in progress was abandoned rather than
+# finished, so it is not logged as a session, but its replay is still saved
+# (pass recorder=None to skip that too).
+def quit_game(state, recorder):
+    if recorder is not None and not state.game_over:
+        save_replay(state, recorder)
+    profiler.close()
+    scores.close()
+    if telemetry is not None:
+        telemetry.close()
+    pygame.quit()
+    sys.exit()
+
+# Main game loop: a fixed-timestep accumulator runs as many simulation ticks
+# as the elapsed wall time calls for, then draws one interpolated frame. When
+# frames take too long, at most max_frame_time of game time is simulated per
+# frame, so the game slows down instead of falling further and further behind.
+def main(argv=None):
+    global screen
+    args = parse_args(argv)
+    init(args)
+    # Everything created during startup lives for the whole session; moving
+    # it out of the collector's generations keeps collections during play short
+    gc.collect()
+    gc.freeze()
+    state, recorder = new_game()
+    game_paused = False
+    tick_seconds = 1 / tick_rate
+    accumulator = 0.0
+    last_time = time.perf_counter()
+    
+    while True:
+        profiler.begin_frame()
+        now = time.perf_counter()
+        elapsed = min(now - last_time, max_frame_time)
+        last_time = now
+        alpha = 1.0
+        
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                quit_game(state, recorder)
+            elif event.type == pygame.VIDEORESIZE:
+                # The canvas keeps its size; only where it is scaled to changes
+                screen = viewport.resize(event.size)
+                dirty_tracker.invalidate()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    # Toggle the frame-time profiler overlay
+                    profiler.toggle()
+                    dirty_tracker.invalidate()
+                elif state.game_over:
+                    if event.key == pygame.K_r:
+                        # Restart with a fresh game
+                        state, recorder = new_game()
+                        accumulator = 0.0
+                    elif event.key == pygame.K_q:
+                        quit_game(state, recorder)
+                elif event.key == pygame.K_p:
+                    game_paused = not game_paused
+                elif event.key == pygame.K_q and game_paused:
+                    game_paused = False
+                    end_game(state, recorder)
+        
+        if not state.game_over:
+            if game_paused:
+                recorder.record(input_bits(paused=True))
+                accumulator = 0.0
+                profiler.lap("input")
+            else:
+                # Move baskets with each player's keys
+                keys = pygame.key.get_pressed()
+                human_inputs = tuple(Inputs(keys[left], keys[right])
+                                     for left, right in KEY_SPLITS[:human_players])
+                profiler.lap("input")
+                
+                accumulator += elapsed
+                while accumulator >= tick_seconds:
+                    accumulator -= tick_seconds
+                    inputs = human_inputs + tuple(greedy_bot(state, basket)
+                                                  for basket in state.baskets[human_players:])
+                    recorder.record(players_bits(inputs))
+                    handle_events(state.step(inputs))
+                    if telemetry is not None:
+                        telemetry.publish(state)
+                    update_particles(state.dt)
+                    profiler.lap("particles")
+                    
+                    if state.game_over:
+                        end_game(state, recorder)
+                        break
+                alpha = accumulator / tick_seconds
+        else:
+            profiler.lap("input")
+        
+        present_frame(state, game_paused, alpha)
+        if sounds is None:
+            startup.mark("first_frame")
+            start_audio()
+            if args.startup_report:
+                startup.report()
+                quit_game(state, None)
+        clock.tick(render_fps)
+        profiler.lap("wait")
+        profiler.end_frame()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import pygame
+import numpy
+
+# Sprite keys pack the palette index and the drawn radius as
+# color * RADIUS_KEYS + radius
+RADIUS_KEYS = 256
+
+
+# Fixed-capacity particle pool stored as NumPy columns (structure of arrays).
+# Particles are integrated, aged and culled with vectorized operations, freed
+# slots go back on a free stack for reuse, and drawing is a single
+# Surface.blits call over pre-rendered circle sprites. Slots are handed out
+# from the bottom of the pool, so live particles sit below `span`, and
+# update(), bounds() and draw() only look at that range: a tick allocates no
+# arrays the size of the pool, and costs nothing when no particles are alive.
+class ParticlePool:
+    def __init__(self, capacity=4096, seed=None):
+        self.capacity = capacity
+        self.x = numpy.zeros(capacity, dtype=numpy.float32)
+        self.y = numpy.zeros(capacity, dtype=numpy.float32)
+        self.vx = numpy.zeros(capacity, dtype=numpy.float32)
+        self.vy = numpy.zeros(capacity, dtype=numpy.float32)
+        self.life = numpy.zeros(capacity, dtype=numpy.float32)
+        self.size = numpy.zeros(capacity, dtype=numpy.float32)
+        self.color = numpy.zeros(capacity, dtype=numpy.int32)  # Index into palette
+        self.alive = numpy.zeros(capacity, dtype=bool)
+        self.span = 0  # Every live slot is below this index
+        self.step = numpy.zeros(capacity, dtype=numpy.float32)  # Scratch for update()
+        self.dead = numpy.zeros(capacity, dtype=bool)
+
+        # Stack of free slot indices; the top is free[free_count - 1]
+        self.free = numpy.arange(capacity - 1, -1, -1, dtype=numpy.int32)
+        self.free_count = capacity
+
+        self.palette = []
+        self.palette_ids = {}
+        self.sprites = {}
+        self.rng = numpy.random.default_rng(seed)
+
+    def __len__(self):
+        return self.capacity - self.free_count
+
+    # Kill every particle, optionally restarting the random stream from a seed
+    def clear(self, seed=None):
+        self.alive[:] = False
+        self.span = 0
+        self.free = numpy.arange(self.capacity - 1, -1, -1, dtype=numpy.int32)
+        self.free_count = self.capacity
+        if seed is not None:
+            self.rng = numpy.random.default_rng(seed)
+
+    # Map a color to its palette index
+    def color_id(self, color):
+        color = tuple(int(c) for c in color)
+        if color not in self.palette_ids:
+            self.palette_ids[color] = len(self.palette)
+            self.palette.append(color)
+        return self.palette_ids[color]
+
+    # Spawn a burst of particles at (x, y). Bursts larger than the free
+    # capacity are truncated rather than growing the pool.
+    def emit(self, x, y, color, count=10):
+        count = min(count, self.free_count)
+        if count <= 0:
+            return
+        self.free_count -= count
+        slots = self.free[self.free_count:self.free_count + count]
+
+        rng = self.rng
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = rng.uniform(-3, 3, count)
+        self.vy[slots] = rng.uniform(-3, 3, count)
+        self.size[slots] = rng.integers(2, 7, count)
+        self.life[slots] = rng.integers(20, 41, count)
+        self.color[slots] = self.color_id(color)
+        self.alive[slots] = True
+        self.span = max(self.span, int(slots.max()) + 1)
+
+    # Move, age and cull all particles; dt is the step length in base ticks
+    def update(self, dt=1.0):
+        n = self.span
+        if not n:
+            return
+        alive, step, dead = self.alive[:n], self.step[:n], self.dead[:n]
+        numpy.multiply(self.vx[:n], dt, out=step)
+        self.x[:n] += step
+        numpy.multiply(self.vy[:n], dt, out=step)
+        self.y[:n] += step
+        life = self.life[:n]
+        life -= dt  # Free slots age too; emit() resets them
+        size = self.size[:n]
+        size -= 0.1 * dt
+        numpy.maximum(size, 0, out=size)
+
+        numpy.less_equal(life, 0, out=dead)
+        dead &= alive
+        if dead.any():
+            dead = numpy.flatnonzero(dead)
+            alive[dead] = False
+            self.free[self.free_count:self.free_count + len(dead)] = dead
+            self.free_count += len(dead)
+            if self.free_count == self.capacity:
+                self.span = 0
+
+    # Circle sprite for a palette color and radius
+    def sprite(self, key):
+        color_id, radius = divmod(key, RADIUS_KEYS)
+        surface = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(surface, self.palette[color_id], (radius, radius), radius)
+        self.sprites[key] = surface
+        return surface
+
+    # Bounding rect of all live particles, or None when there are none.
+    # Positions and sizes are multiplied by scale, as in draw().
+    def bounds(self, scale=1.0):
+        if not self.span:
+            return None
+        idx = numpy.flatnonzero(self.alive[:self.span])
+        if not len(idx):
+            return None
+        x, y = self.x[idx] * scale, self.y[idx] * scale
+        margin = int(7 * scale) + 1
+        left, top = int(x.min()) - margin, int(y.min()) - margin
+        return pygame.Rect(left, top, int(x.max()) + margin + 1 - left, int(y.max()) + margin + 1 - top)
+
+    # Draw all live particles in one batched blit, with positions and sizes
+    # multiplied by scale. Sprites are cached per drawn radius, so every
+    # render scale gets sharp circles of its own.
+    def draw(self, surface, scale=1.0):
+        if not self.span:
+            return
+        idx = numpy.flatnonzero(self.alive[:self.span])
+        if not len(idx):
+            return
+        radius = numpy.minimum(self.size[idx] * scale, RADIUS_KEYS - 1).astype(numpy.int32)
+        visible = radius > 0
+        idx, radius = idx[visible], radius[visible]
+
+        keys = self.color[idx] * RADIUS_KEYS + radius
+        left = (self.x[idx] * scale).astype(numpy.int32) - radius
+        top = (self.y[idx] * scale).astype(numpy.int32) - radius
+
+        sprites = self.sprites
+        for key in numpy.unique(keys).tolist():
+            if key not in sprites:
+                self.sprite(key)
+        surface.blits([(sprites[key], (px, py))
+                       for key, px, py in zip(keys.tolist(), left.tolist(), top.tolist())],
+                      doreturn=False)
@@ -0,0 +1,192 @@
+import csv
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import numpy
+import pygame
+
+# Phases of one frame, in the order they run
+PHASES = [
+    "input", "magnet", "spawn", "blocks", "power_ups", "particles",
+    "draw_background", "draw_particles", "draw_objects", "draw_basket", "draw_ui",
+    "draw_overlay", "flip", "wait",
+]
+
+# Per-frame counters: net growth in allocated memory blocks
+# (sys.getallocatedblocks; short-lived allocations cancel out), peak KiB
+# allocated above the level at the start of the frame (tracemalloc; 0 unless
+# allocation tracking is on) and garbage collector runs
+COUNTERS = ["net_blocks", "alloc_peak_kb", "gc_runs"]
+
+
+# Per-frame phase timer. Code calls lap(name) at the end of each phase; the
+# time since the previous lap is charged to that phase. Keeps a rolling
+# window for p50/p95/p99 statistics, can draw them as an on-screen overlay
+# and can stream one row per frame to a CSV or NDJSON trace file. Alongside
+# the phases it counts net allocations and garbage collector runs per frame,
+# and the time spent in the collector ("gc", which is also included in the
+# phase that triggered it). With track_allocations it also traces every
+# allocation with tracemalloc and records the per-frame peak, which shows
+# short-lived churn that net growth hides; tracing slows the game down, so it
+# is off by default.
+class FrameProfiler:
+    def __init__(self, window=300, trace_path=None, track_allocations=False):
+        self.history = {name: deque(maxlen=window) for name in PHASES + ["gc", "busy", "total"] + COUNTERS}
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame = 0
+        self.frame_start = self.last = time.perf_counter()
+        self.blocks_start = sys.getallocatedblocks()
+        self.gc_runs = 0
+        self.gc_time = 0.0
+        self.gc_start = 0.0
+        gc.callbacks.append(self.on_gc)
+        self.track_allocations = track_allocations
+        self.traced_start = 0
+        if track_allocations:
+            tracemalloc.start()
+
+        self.visible = False
+        self.overlay = None
+        self.overlay_frame = -1
+
+        self.trace_file = None
+        self.trace_writer = None
+        if trace_path is not None:
+            self.open_trace(trace_path)
+
+    # Start a trace file; the format follows the extension (.ndjson or .csv)
+    def open_trace(self, path):
+        self.trace_file = open(path, "w", newline="")
+        if path.endswith(".ndjson") or path.endswith(".jsonl"):
+            self.trace_writer = None
+        else:
+            self.trace_writer = csv.writer(self.trace_file)
+            self.trace_writer.writerow(["frame"] + PHASES + ["gc", "busy", "total"] + COUNTERS)
+
+    def close(self):
+        if self.on_gc in gc.callbacks:
+            gc.callbacks.remove(self.on_gc)
+        if self.track_allocations:
+            tracemalloc.stop()
+            self.track_allocations = False
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    # Garbage collector hook: count runs and time them
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        else:
+            self.gc_runs += 1
+            self.gc_time += time.perf_counter() - self.gc_start
+
+    def begin_frame(self):
+        self.frame_start = self.last = time.perf_counter()
+        current = self.current
+        for name in current:
+            current[name] = 0.0
+        self.gc_runs = 0
+        self.gc_time = 0.0
+        self.blocks_start = sys.getallocatedblocks()
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+
+    # Charge the time since the previous lap to a phase
+    def lap(self, name):
+        now = time.perf_counter()
+        self.current[name] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        net_blocks = sys.getallocatedblocks() - self.blocks_start
+        alloc_peak_kb = 0.0
+        if self.track_allocations:
+            alloc_peak_kb = round((tracemalloc.get_traced_memory()[1] - self.traced_start) / 1024, 1)
+        current = self.current
+        total = self.last - self.frame_start
+        busy = total - current["wait"]
+        history = self.history
+        for name, seconds in current.items():
+            history[name].append(seconds)
+        history["gc"].append(self.gc_time)
+        history["busy"].append(busy)
+        history["total"].append(total)
+        history["net_blocks"].append(net_blocks)
+        history["alloc_peak_kb"].append(alloc_peak_kb)
+        history["gc_runs"].append(self.gc_runs)
+
+        if self.trace_file is not None:
+            times_ms = [round(seconds * 1000, 4) for seconds in
+                        [current[name] for name in PHASES] + [self.gc_time, busy, total]]
+            counts = [net_blocks, alloc_peak_kb, self.gc_runs]
+            if self.trace_writer is not None:
+                self.trace_writer.writerow([self.frame] + times_ms + counts)
+            else:
+                row = {"frame": self.frame, **dict(zip(PHASES + ["gc", "busy", "total"], times_ms)),
+                       **dict(zip(COUNTERS, counts))}
+                self.trace_file.write(json.dumps(row) + "\n")
+        self.frame += 1
+
+    # Rolling (p50, p95, p99) for every phase in milliseconds, and for every
+    # counter as a plain count
+    def percentiles(self):
+        stats = {}
+        for name, samples in self.history.items():
+            scale = 1 if name in COUNTERS else 1000
+            if samples:
+                stats[name] = tuple((numpy.percentile(numpy.fromiter(samples, float), (50, 95, 99)) * scale).tolist())
+            else:
+                stats[name] = (0.0, 0.0, 0.0)
+        return stats
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    # Render the statistics table; refreshed twice a second
+    def build_overlay(self, font):
+        stats = self.percentiles()
+        rows = [f"{'phase':<16}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        rows.extend(f"{name:<16}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}" for name, (p50, p95, p99) in stats.items())
+        lines = [font.render(row, True, (255, 255, 255)) for row in rows]
+        height = sum(line.get_height() for line in lines) + 10
+        surface = pygame.Surface((max(line.get_width() for line in lines) + 10, height))
+        surface.fill((20, 20, 20))
+        y = 5
+        for line in lines:
+            surface.blit(line, (5, y))
+            y += line.get_height()
+        return surface
+
+    # Draw the overlay in the bottom-left corner; returns the covered rect
+    def draw(self, target, font):
+        if self.overlay is None or self.frame - self.overlay_frame >= 30:
+            self.overlay = self.build_overlay(font)
+            self.overlay_frame = self.frame
+        rect = self.overlay.get_rect(bottomleft=(10, target.get_height() - 40))
+        target.blit(self.overlay, rect)
+        return rect
+
+
+# Wall-clock timer for the phases of startup, from the first line of the entry
+# module to the first presented frame. mark(name) closes a phase; report()
+# prints them in the same layout as `python -X importtime`.
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = self.last = time.perf_counter() if start is None else start
+        self.phases = []  # (name, seconds, cumulative seconds)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last, now - self.start))
+        self.last = now
+
+    def report(self, file=sys.stderr):
+        print("startup: self [us] | cumulative | phase", file=file)
+        for name, seconds, cumulative in self.phases:
+            print(f"startup: {seconds * 1e6:>9.0f} | {cumulative * 1e6:>10.0f} | {name}", file=file)
@@ -0,0 +1,72 @@
+import json
+import os
+from bisect import bisect_left
+from itertools import accumulate
+
+# Block and power-up types shipped with the game
+TYPES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "object_types.json")
+
+# Power-up names the simulation knows how to apply
+POWER_UP_EFFECTS = ("slow_motion", "double_points", "magnet", "shield")
+
+
+# Weighted picker compiled from {name: weight}: names in order plus their
+# running weight totals. pick() draws one integer from the RNG and finds the
+# name by binary search over the totals.
+class SpawnTable:
+    def __init__(self, weights):
+        negative = [name for name, weight in weights.items() if weight < 0]
+        if negative:
+            raise ValueError(f"negative spawn weights: {', '.join(negative)}")
+        self.names = tuple(weights)
+        self.cumulative = list(accumulate(weights.values()))
+        self.total = self.cumulative[-1] if self.cumulative else 0
+        if self.total <= 0:
+            raise ValueError("spawn weights must add up to more than zero")
+
+    def pick(self, rng):
+        return self.names[bisect_left(self.cumulative, rng.randint(1, self.total))]
+
+
+# One kind of falling object (blocks or power-ups) compiled from its data
+# file entries. Every type gets an integer id in file order; `props` maps
+# names to their properties and `names`/`ids` translate between the two.
+# The tables are compiled once, when the file is loaded. The registry is
+# load-time only: type ids, spawn tables and everything built from them
+# (bot lookup tables, the telemetry packet layout, cached sprites) assume
+# the types never change while the program runs, so new types mean editing
+# the data file and restarting.
+class TypeTable:
+    def __init__(self, entries, weight_key=None):
+        self.props = {}
+        for entry in entries:
+            entry = dict(entry)
+            entry["color"] = tuple(entry["color"])
+            self.props[entry.pop("name")] = entry
+        self.names = tuple(self.props)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.spawn_table = None
+        if weight_key is not None:
+            self.spawn_table = SpawnTable({name: props[weight_key] for name, props in self.props.items()})
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+# All object types of one game
+class TypeRegistry:
+    def __init__(self, blocks, power_ups):
+        self.blocks = TypeTable(blocks, weight_key="spawn_chance")
+        self.power_ups = TypeTable(power_ups)
+        unknown = [name for name in self.power_ups if name not in POWER_UP_EFFECTS]
+        if unknown:
+            raise ValueError(f"power-ups without a known effect: {', '.join(unknown)}")
+
+
+def load_types(path=TYPES_FILE):
+    with open(path) as f:
+        data = json.load(f)
+    return TypeRegistry(data["blocks"], data["power_ups"])
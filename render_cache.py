@@ -0,0 +1,224 @@
+import math
+from collections import OrderedDict
+
+import pygame
+import numpy
+
+from simulation import (
+    WHITE, BLACK, RED, block_size, level_colors, BLOCK_TYPES, POWERUP_TYPES,
+)
+
+
+# Pre-rendered gradient backgrounds. The gradient only depends on the level
+# color and the surface size, so each is built once and then blitted in a
+# single call per frame instead of drawing one line per row. Backgrounds are
+# kept per (level, size), so switching render resolutions back and forth does
+# not rebuild them.
+class BackgroundCache:
+    def __init__(self):
+        self.surfaces = {}
+
+    # Build the gradient for a level color with one vectorized fill
+    def build(self, color, size):
+        width, height = size
+        intensity = 0.3 + 0.7 * (numpy.arange(height) / height)
+        column = numpy.minimum(255, (numpy.array(color)[None, :] * intensity[:, None]).astype(numpy.int32))
+        pixels = numpy.repeat(column[None, :, :], width, axis=0)  # surfarray is indexed [x, y]
+        surface = pygame.surfarray.make_surface(pixels.astype(numpy.uint8))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    # Return the background for a level at a size, building it on first use
+    def get(self, level, size):
+        key = (level, tuple(size))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = self.build(level_colors[level - 1], key[1])
+        return surface
+
+
+# Number of discrete steps a pulsing glyph's color is quantized into
+PULSE_BUCKETS = 16
+
+
+# Quantize a (sin(ticks * rate) + 1) pulse into a sprite variant index
+def pulse_bucket(ticks, rate):
+    return int((math.sin(ticks * rate) + 1) / 2 * (PULSE_BUCKETS - 1) + 0.5)
+
+
+# Pulse offset for a variant index, where amplitude is the peak of sin() + 1
+def pulse_amount(variant, amplitude):
+    return variant / (PULSE_BUCKETS - 1) * 2 * amplitude
+
+
+# Outline width for a glyph of the given size: 2 pixels at block_size
+def line_width(size):
+    return max(1, size // 15)
+
+
+# Glyph markings drawn over an object's colored square of the given size,
+# keyed by the "glyph" name in object_types.json
+def mark_dot(surface, size):
+    pygame.draw.circle(surface, WHITE, (size//2, size//2), size//4)
+
+
+def mark_cross(surface, size):
+    inset = size // 6
+    pygame.draw.line(surface, WHITE, (inset, inset), (size - inset, size - inset), line_width(size))
+    pygame.draw.line(surface, WHITE, (size - inset, inset), (inset, size - inset), line_width(size))
+
+
+def mark_triangle(surface, size):
+    inset = size // 6
+    pygame.draw.polygon(surface, WHITE, [(size//2, inset),
+                                         (size - inset, size - inset),
+                                         (inset, size - inset)])
+
+
+def mark_square(surface, size):
+    pygame.draw.rect(surface, WHITE, (size//4, size//4, size//2, size//2))
+
+
+def mark_bomb(surface, size):
+    pygame.draw.circle(surface, RED, (size//2, size//2), size//3)
+
+
+def mark_clock(surface, size):
+    pygame.draw.circle(surface, WHITE, (size//2, size//2), size//3, line_width(size))
+    pygame.draw.line(surface, WHITE, (size//2, size//3), (size//2, 2*size//3), line_width(size))
+
+
+def mark_x(surface, size):
+    pygame.draw.line(surface, WHITE, (size//3, size//3), (2*size//3, 2*size//3), line_width(size))
+    pygame.draw.line(surface, WHITE, (2*size//3, size//3), (size//3, 2*size//3), line_width(size))
+
+
+def mark_arc(surface, size):
+    inset = size // 6
+    pygame.draw.arc(surface, WHITE, (inset, inset, size - 2*inset, size - 2*inset),
+                    math.pi/4, 7*math.pi/4, line_width(size))
+
+
+def mark_ring(surface, size):
+    pygame.draw.circle(surface, WHITE, (size//2, size//2), size//3, line_width(size))
+
+
+def mark_none(surface, size):
+    pass
+
+
+GLYPH_MARKS = {
+    "dot": mark_dot, "cross": mark_cross, "triangle": mark_triangle, "square": mark_square,
+    "bomb": mark_bomb, "clock": mark_clock, "x": mark_x, "arc": mark_arc, "ring": mark_ring,
+    None: mark_none,
+}
+
+
+# Block color effects, keyed by the "effect" name in object_types.json. Each
+# maps the base color and the sprite variant to the color to fill with.
+def pulse_color(color, variant):
+    pulse = pulse_amount(variant, 40)
+    return (min(255, int(color[0] + pulse)), min(255, int(color[1] + pulse)), color[2])
+
+
+def flicker_color(color, variant):
+    return RED if variant else color
+
+
+def plain_color(color, variant):
+    return color
+
+
+COLOR_EFFECTS = {"pulse": pulse_color, "flicker": flicker_color, None: plain_color}
+
+
+# Draw a block glyph of the given size at the top-left corner of a surface
+def draw_block_glyph(surface, block_type, variant, size=block_size):
+    props = BLOCK_TYPES[block_type]
+    color = COLOR_EFFECTS[props.get("effect")](props["color"], variant)
+
+    pygame.draw.rect(surface, color, (0, 0, size, size))
+    pygame.draw.rect(surface, BLACK, (0, 0, size, size), line_width(size))
+    GLYPH_MARKS[props.get("glyph")](surface, size)
+
+
+# Draw a power-up glyph of the given size at the top-left corner of a surface
+def draw_power_up_glyph(surface, power_type, variant, size=block_size):
+    props = POWERUP_TYPES[power_type]
+    color = props["color"]
+
+    # Pulsing effect for power-ups
+    pulse = pulse_amount(variant, 30)
+    color = (min(255, int(color[0] + pulse)), min(255, int(color[1] + pulse)), min(255, int(color[2] + pulse)))
+
+    pygame.draw.rect(surface, color, (0, 0, size, size))
+    pygame.draw.rect(surface, BLACK, (0, 0, size, size), line_width(size))
+    GLYPH_MARKS[props.get("glyph")](surface, size)
+
+
+# Pre-rendered block and power-up glyphs keyed by (kind, type, variant, size).
+# The variant is the pulse phase bucket for pulsing glyphs, the flicker state
+# for bombs and 0 otherwise. Glyphs are rasterized directly at the size they
+# are drawn at, so they stay sharp at any render resolution, and each is
+# rasterized at most once per size.
+class SpriteAtlas:
+    def __init__(self):
+        self.sprites = {}
+
+    # Rasterize one glyph into its own surface
+    def build(self, draw_glyph, type_name, variant, size):
+        surface = pygame.Surface((size, size))
+        draw_glyph(surface, type_name, variant, size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def block(self, block_type, variant=0, size=block_size):
+        key = ("block", block_type, variant, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.build(draw_block_glyph, block_type, variant, size)
+        return sprite
+
+    def power_up(self, power_type, variant=0, size=block_size):
+        key = ("power_up", power_type, variant, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.build(draw_power_up_glyph, power_type, variant, size)
+        return sprite
+
+
+# LRU cache of rendered text surfaces keyed by (font, text, color), so text
+# that does not change between frames is rasterized only once.
+class TextCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+
+        surface = font.render(text, True, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return surface
+
+
+# A single cached surface that is rebuilt only when its key changes. Used for
+# static screens such as the pause and game over overlays.
+class SurfaceCache:
+    def __init__(self):
+        self.key = None
+        self.surface = None
+
+    def get(self, key, build):
+        if key != self.key:
+            self.surface = build()
+            self.key = key
+        return self.surface
@@ -0,0 +1,213 @@
+import struct
+import sys
+import time
+
+from simulation import GameState, Inputs
+
+# Replay file layout (little endian):
+#   header: magic, format version, seed (u64), tick rate (u16), players (u8),
+#           frame count (u32)
+#   body:   runs of (input bits u16, run length u16)
+# Each frame is one simulation tick with every player's left/right bits held
+# during it (two bits per player, player 1 lowest), or a rendered frame spent
+# paused (pause bit set, no tick).
+# Inputs are held for long stretches, so run-length encoding keeps a typical
+# session down to a few kilobytes.
+REPLAY_MAGIC = b"FBCR"
+REPLAY_VERSION = 3
+HEADER = struct.Struct("<4sBQHBI")
+RUN = struct.Struct("<HH")
+# Versions 1 and 2 were single player with u8 input bits and the pause bit
+# at 4; version 1 had no tick rate and always ran at 60
+HEADER_V1 = struct.Struct("<4sBQI")
+HEADER_V2 = struct.Struct("<4sBQHI")
+RUN_V2 = struct.Struct("<BH")
+PAUSE_V2 = 4
+MAX_RUN = 0xFFFF
+
+LEFT = 1
+RIGHT = 2
+PAUSE = 0x8000
+MAX_PLAYERS = 7
+
+
+# Pack one frame's inputs for player 1 into replay bits
+def input_bits(left=False, right=False, paused=False):
+    return (LEFT if left else 0) | (RIGHT if right else 0) | (PAUSE if paused else 0)
+
+
+# Pack one frame's inputs for every player into replay bits
+def players_bits(inputs):
+    bits = 0
+    for i, (left, right) in enumerate(inputs):
+        bits |= input_bits(left, right) << (2 * i)
+    return bits
+
+
+# Unpack replay bits into one Inputs per player
+def bits_inputs(bits, players):
+    return tuple(Inputs(bool(bits >> (2 * i) & LEFT), bool(bits >> (2 * i) & RIGHT))
+                 for i in range(players))
+
+
+# Collects per-frame inputs for one game and writes them as a replay file
+class ReplayRecorder:
+    def __init__(self, seed, tick_rate=60, players=1):
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.players = players
+        self.frames = 0
+        self.runs = []  # [bits, length] pairs
+
+    def record(self, bits):
+        runs = self.runs
+        if runs and runs[-1][0] == bits and runs[-1][1] < MAX_RUN:
+            runs[-1][1] += 1
+        else:
+            runs.append([bits, 1])
+        self.frames += 1
+
+    def to_bytes(self):
+        body = b"".join(RUN.pack(bits, length) for bits, length in self.runs)
+        return HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.tick_rate, self.players, self.frames) + body
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+# Decode replay bytes into (seed, tick rate, players, list of per-frame
+# input bits)
+def decode_replay(data):
+    magic, version = struct.unpack_from("<4sB", data)
+    if magic != REPLAY_MAGIC or version not in (1, 2, REPLAY_VERSION):
+        raise ValueError("not a Falling Blocks Catcher replay (or unsupported version)")
+    if version == REPLAY_VERSION:
+        _, _, seed, tick_rate, players, frame_count = HEADER.unpack_from(data)
+        runs = RUN.iter_unpack(data[HEADER.size:])
+    else:
+        if version == 1:
+            _, _, seed, frame_count = HEADER_V1.unpack_from(data)
+            tick_rate, body = 60, data[HEADER_V1.size:]
+        else:
+            _, _, seed, tick_rate, frame_count = HEADER_V2.unpack_from(data)
+            body = data[HEADER_V2.size:]
+        players = 1
+        runs = ((bits & ~PAUSE_V2 | (PAUSE if bits & PAUSE_V2 else 0), length)
+                for bits, length in RUN_V2.iter_unpack(body))
+
+    frames = []
+    for bits, length in runs:
+        frames.extend([bits] * length)
+    if len(frames) != frame_count:
+        raise ValueError(f"truncated replay: expected {frame_count} frames, found {len(frames)}")
+    return seed, tick_rate, players, frames
+
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        return decode_replay(f.read())
+
+
+# Re-simulate a replay without rendering, as fast as possible. Paused frames
+# are skipped, exactly as the live game does. Returns the final GameState.
+def play_replay(seed, frames, tick_rate=60, players=1):
+    state = GameState(seed, tick_rate, players=players)
+    step = state.step
+    inputs = {}  # Decoded inputs by bits
+    for bits in frames:
+        if state.game_over:
+            break
+        if not bits & PAUSE:
+            frame_inputs = inputs.get(bits)
+            if frame_inputs is None:
+                frame_inputs = inputs[bits] = bits_inputs(bits, players)
+            step(frame_inputs)
+    return state
+
+
+# Scripted inputs for the determinism check: player p sweeps left and right
+# over a period of 300 + 50 * p frames, and the game is paused for the last
+# 10 frames of every 1000
+def scripted_frames(count, players=1):
+    frames = []
+    for i in range(count):
+        if i % 1000 >= 990:
+            frames.append(PAUSE)
+        else:
+            frames.append(players_bits([(i % (300 + 50 * p) < 150 + 25 * p, i % (300 + 50 * p) >= 150 + 25 * p)
+                                        for p in range(players)]))
+    return frames
+
+
+# Encode single-player frames in the version 1 or 2 layout, as older builds
+# wrote them
+def legacy_replay_bytes(version, seed, tick_rate, frames):
+    recorder = ReplayRecorder(seed, tick_rate)
+    for bits in frames:
+        recorder.record(bits & (LEFT | RIGHT) | (PAUSE_V2 if bits & PAUSE else 0))
+    if version == 1:
+        header = HEADER_V1.pack(REPLAY_MAGIC, 1, seed, recorder.frames)
+    else:
+        header = HEADER_V2.pack(REPLAY_MAGIC, 2, seed, tick_rate, recorder.frames)
+    return header + b"".join(RUN_V2.pack(bits, length) for bits, length in recorder.runs)
+
+
+# Scripted replays and how they end: (format version, seed, tick rate,
+# players, frames, (ticks, score, health, level, game over)). The outcomes
+# were recorded with the builds that introduced each format, so a change
+# that alters any of them breaks existing replay files.
+DETERMINISM_CASES = [
+    (1, 7, 60, 1, 20000, (11256, 1235, 0, 3, True)),
+    (2, 3, 120, 1, 20000, (14877, 1560, -5, 3, True)),
+    (3, 11, 144, 3, 30000, (5943, 445, 0, 1, True)),
+]
+
+
+# Check that every format decodes to the frames it was written from and that
+# the scripted replays still play out exactly as recorded. Returns a list of
+# failures, empty when everything matches.
+def check_determinism():
+    failures = []
+    for version, seed, tick_rate, players, count, expected in DETERMINISM_CASES:
+        frames = scripted_frames(count, players)
+        if version == REPLAY_VERSION:
+            recorder = ReplayRecorder(seed, tick_rate, players)
+            for bits in frames:
+                recorder.record(bits)
+            data = recorder.to_bytes()
+        else:
+            data = legacy_replay_bytes(version, seed, tick_rate, frames)
+        name = f"v{version} seed={seed} tick_rate={tick_rate} players={players}"
+        if decode_replay(data) != (seed, tick_rate, players, frames):
+            failures.append(f"{name}: decoded frames differ from the recorded ones")
+            continue
+        state = play_replay(seed, frames, tick_rate, players)
+        outcome = (state.tick, state.score, state.health, state.level, state.game_over)
+        if outcome != expected:
+            failures.append(f"{name}: ended with {outcome}, expected {expected}")
+    return failures
+
+
+# Replay files from the command line and report the outcome and speed, or
+# with --check run the determinism check
+def main(paths):
+    if paths == ["--check"]:
+        failures = check_determinism()
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        print(f"{len(DETERMINISM_CASES) - len(failures)}/{len(DETERMINISM_CASES)} replays play back as recorded")
+        return 1 if failures else 0
+    for path in paths:
+        seed, tick_rate, players, frames = load_replay(path)
+        start = time.perf_counter()
+        state = play_replay(seed, frames, tick_rate, players)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: seed={seed} tick_rate={tick_rate} players={players} frames={len(frames)} ticks={state.tick} "
+              f"score={state.score} level={state.level} health={state.health} "
+              f"game_over={state.game_over} ({state.tick / max(elapsed, 1e-9):.0f} ticks/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    seed INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    power_ups TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (score DESC, id);
+"""
+
+# Seeds are unsigned 64-bit; SQLite integers are signed
+SIGN_BIT = 1 << 63
+
+
+def to_db_seed(seed):
+    return seed - (1 << 64) if seed >= SIGN_BIT else seed
+
+
+def from_db_seed(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# One finished session, as stored in the log
+def session_row(state):
+    return (time.time(), to_db_seed(state.seed), state.score, state.level,
+            state.tick / state.tick_rate, json.dumps(state.power_ups_used, separators=(",", ":")))
+
+
+# Persistent log of finished sessions in an SQLite database. Sessions are
+# only ever appended. The database runs in write-ahead-log mode, so a crash
+# can lose at most the last unflushed batch but never corrupts earlier
+# sessions. record() only queues the session; a background thread writes
+# queued sessions in batches, one transaction per batch, so the caller never
+# waits on the disk. The score index keeps best() and top() at O(log n).
+class ScoreStore:
+    def __init__(self, path="scores.db", batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self.reader = self.connect()
+        self.reader.executescript(SCHEMA)
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop, name="score-writer", daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # Queue a finished game for writing
+    def record(self, state):
+        self.pending.put(session_row(state))
+
+    # Background thread: write whatever is queued in one transaction, until
+    # close() queues None
+    def write_loop(self):
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [row for row in batch if row is not None]
+            if batch:
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO sessions (finished_at, seed, score, level, duration, power_ups) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        connection.close()
+
+    # Highest score on record, or 0
+    def best(self):
+        row = self.reader.execute("SELECT score FROM sessions ORDER BY score DESC LIMIT 1").fetchone()
+        return row[0] if row else 0
+
+    # The n best sessions as dicts, highest score first (earliest first on ties)
+    def top(self, n=10):
+        rows = self.reader.execute(
+            "SELECT finished_at, seed, score, level, duration, power_ups FROM sessions "
+            "ORDER BY score DESC, id LIMIT ?", (n,)).fetchall()
+        return [{"finished_at": finished_at, "seed": from_db_seed(seed), "score": score, "level": level,
+                 "duration": duration, "power_ups": json.loads(power_ups)}
+                for finished_at, seed, score, level, duration, power_ups in rows]
+
+    def count(self):
+        return self.reader.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # Write everything still queued, then stop the writer thread
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        self.reader.close()
+
+
+# Print the leaderboard of a score database
+def main(argv):
+    path = argv[0] if argv else "scores.db"
+    n = int(argv[1]) if len(argv) > 1 else 10
+    store = ScoreStore(path)
+    print(f"{store.count()} sessions in {path}")
+    for rank, session in enumerate(store.top(n), 1):
+        finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(session["finished_at"]))
+        used = ", ".join(f"{name} x{count}" for name, count in session["power_ups"].items() if count)
+        print(f"{rank:>3}. {session['score']:>7}  level {session['level']}  {session['duration']:>7.1f} s  "
+              f"{finished}  seed {session['seed']}  {used}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,283 @@
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy
+
+from simulation import GameState, Inputs, POWERUP_TYPES
+
+# Telemetry packet layout (little endian), one UDP or Unix datagram per tick:
+#   header:  magic, version, kind, stream id (u32), tick (u32), base tick (u32)
+#   game:    seed (u64), score (i32), health (i16), level (u8), players (u8)
+#   baskets: per player, x (f32) and one u16 tick countdown per power-up
+#   objects: blocks, then power-ups, each
+#            FULL:  mode (u8), count (u16), type ids (u8 * count),
+#                   x and y in quarter pixels (i16 * count each)
+#            DELTA: mode (u8), count (u16), dx and dy (i8 * count each)
+# A KEY packet is self-contained. A DELTA packet applies to the snapshot of
+# base tick; object sections in DELTA mode reuse that snapshot's types and
+# add the per-object moves, which only works while no object spawned or left
+# (otherwise the section is sent in FULL mode). Keyframes are sent at a fixed
+# interval, so a subscriber that joins late or loses packets resyncs quickly.
+TELEMETRY_MAGIC = b"FBCT"
+TELEMETRY_VERSION = 1
+HEADER = struct.Struct("<4sBBIII")
+GAME = struct.Struct("<QihBB")
+BASKET = struct.Struct("<f" + "H" * len(POWERUP_TYPES))
+SECTION = struct.Struct("<BH")
+KEY, DELTA = 0, 1
+FULL = 0
+POSITION_SCALE = 4  # Quarter-pixel positions
+
+
+# Everything published for one tick, copied on the game thread. Copying is
+# all the game thread pays; quantizing happens on the sender thread.
+def capture(state):
+    blocks, power_ups = state.blocks, state.power_ups
+    n, m = len(blocks), len(power_ups)
+    return (state.tick, state.seed, state.score, state.health, state.level,
+            [(basket.x, basket.power_up_timers(state.tick)) for basket in state.baskets],
+            (blocks.type_id[:n].copy(), blocks.x[:n].copy(), blocks.y[:n].copy()),
+            (power_ups.type_id[:m].copy(), power_ups.x[:m].copy(), power_ups.y[:m].copy()))
+
+
+# Convert a captured snapshot to the packet's fixed-point form
+def quantize(snapshot):
+    tick, seed, score, health, level, baskets, blocks, power_ups = snapshot
+
+    def objects(columns):
+        type_id, x, y = columns
+        return (type_id.astype(numpy.uint8),
+                (x * POSITION_SCALE).astype(numpy.int16),
+                (y * POSITION_SCALE).astype(numpy.int16))
+
+    baskets = [(x, tuple(min(duration, 0xFFFF) for duration in timers)) for x, timers in baskets]
+    return (tick, seed, score, health, level, baskets, objects(blocks), objects(power_ups))
+
+
+# Encode one object section, as moves from the base section when possible
+def encode_objects(current, base):
+    types, x, y = current
+    if base is not None and len(base[0]) == len(types) and numpy.array_equal(base[0], types):
+        dx, dy = x - base[1], y - base[2]
+        if len(types) == 0 or (numpy.abs(dx).max() < 128 and numpy.abs(dy).max() < 128):
+            return SECTION.pack(DELTA, len(types)) + dx.astype(numpy.int8).tobytes() + dy.astype(numpy.int8).tobytes()
+    return SECTION.pack(FULL, len(types)) + types.tobytes() + x.tobytes() + y.tobytes()
+
+
+# Encode a quantized snapshot as a KEY packet (base None) or a DELTA packet
+def encode_snapshot(stream, snapshot, base=None):
+    tick, seed, score, health, level, baskets, blocks, power_ups = snapshot
+    kind = KEY if base is None else DELTA
+    parts = [HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, kind, stream, tick, 0 if base is None else base[0]),
+             GAME.pack(seed, score, max(-0x8000, health), level, len(baskets))]
+    parts.extend(BASKET.pack(x, *timers) for x, timers in baskets)
+    parts.append(encode_objects(blocks, None if base is None else base[6]))
+    parts.append(encode_objects(power_ups, None if base is None else base[7]))
+    return b"".join(parts)
+
+
+# Parse "host:port" as a UDP address and anything else as a Unix socket path
+def parse_address(address):
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+# Publishes per-tick snapshots to one or more local datagram addresses.
+# publish() only captures the state and hands it to a background thread,
+# which encodes and sends; when the thread falls behind, the oldest pending
+# snapshot is dropped rather than making the game wait. Sends are
+# non-blocking and a subscriber that is not listening is skipped.
+class TelemetryPublisher:
+    def __init__(self, addresses, stream=None, keyframe_interval=60, backlog=8):
+        self.targets = []
+        for address in addresses:
+            family, target = parse_address(address)
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self.targets.append((sock, target))
+        self.stream = os.getpid() if stream is None else stream
+        self.keyframe_interval = keyframe_interval
+        self.pending = queue.Queue(maxsize=backlog)
+        self.sent = 0
+        self.dropped = 0
+        self.sender = threading.Thread(target=self.send_loop, name="telemetry", daemon=True)
+        self.sender.start()
+
+    def publish(self, state):
+        snapshot = capture(state)
+        while True:
+            try:
+                self.pending.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.pending.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    # Background thread: encode and send snapshots until close() queues None
+    def send_loop(self):
+        base = None
+        since_key = 0
+        while True:
+            snapshot = self.pending.get()
+            if snapshot is None:
+                break
+            snapshot = quantize(snapshot)
+            # A new game (tick went backwards) or a full interval forces a keyframe
+            if base is None or snapshot[0] <= base[0] or since_key >= self.keyframe_interval:
+                packet = encode_snapshot(self.stream, snapshot)
+                since_key = 0
+            else:
+                packet = encode_snapshot(self.stream, snapshot, base)
+                since_key += 1
+            base = snapshot
+            for sock, target in self.targets:
+                try:
+                    sock.sendto(packet, target)
+                except OSError:  # Nobody listening, or the socket buffer is full
+                    pass
+            self.sent += 1
+
+    def close(self):
+        self.pending.put(None)
+        self.sender.join()
+        for sock, _ in self.targets:
+            sock.close()
+
+
+# Rebuilds full snapshots from a stream of packets. Returns None for packets
+# that cannot be applied yet (a delta whose base was lost).
+class TelemetryDecoder:
+    def __init__(self):
+        self.snapshots = {}  # Latest snapshot per stream id
+
+    def decode_objects(self, data, offset, base):
+        mode, count = SECTION.unpack_from(data, offset)
+        offset += SECTION.size
+        if mode == FULL:
+            types = numpy.frombuffer(data, numpy.uint8, count, offset)
+            x = numpy.frombuffer(data, numpy.int16, count, offset + count)
+            y = numpy.frombuffer(data, numpy.int16, count, offset + 3 * count)
+            return (types, x, y), offset + 5 * count
+        dx = numpy.frombuffer(data, numpy.int8, count, offset)
+        dy = numpy.frombuffer(data, numpy.int8, count, offset + count)
+        return (base[0], (base[1] + dx).astype(numpy.int16), (base[2] + dy).astype(numpy.int16)), offset + 2 * count
+
+    def decode(self, data):
+        magic, version, kind, stream, tick, base_tick = HEADER.unpack_from(data)
+        if magic != TELEMETRY_MAGIC or version != TELEMETRY_VERSION:
+            raise ValueError("not a Falling Blocks Catcher telemetry packet")
+        base = self.snapshots.get(stream)
+        if kind == DELTA and (base is None or base["tick"] != base_tick):
+            return None
+
+        seed, score, health, level, players = GAME.unpack_from(data, HEADER.size)
+        offset = HEADER.size + GAME.size
+        baskets = []
+        for _ in range(players):
+            x, *timers = BASKET.unpack_from(data, offset)
+            baskets.append({"x": x, "power_up_timers": dict(zip(POWERUP_TYPES, timers))})
+            offset += BASKET.size
+        blocks, offset = self.decode_objects(data, offset, base and base["blocks"])
+        power_ups, offset = self.decode_objects(data, offset, base and base["power_ups"])
+
+        snapshot = {"stream": stream, "tick": tick, "seed": seed, "score": score, "health": health,
+                    "level": level, "baskets": baskets, "blocks": blocks, "power_ups": power_ups}
+        self.snapshots[stream] = snapshot
+        return snapshot
+
+
+# Play scripted games, encode every tick as the publisher does (keyframes
+# at keyframe_interval, deltas in between) and check that decoding gives back
+# exactly what was encoded. Returns a list of failures, empty when all ticks
+# round-trip.
+def check_round_trip(games=((5, 1, 60), (9, 3, 144)), ticks=3000, keyframe_interval=60):
+    failures = []
+    for seed, players, tick_rate in games:
+        state = GameState(seed, tick_rate=tick_rate, players=players)
+        decoder = TelemetryDecoder()
+        base = None
+        since_key = 0
+        for tick in range(ticks):
+            if state.game_over:
+                break
+            state.step(tuple(Inputs(tick % (200 + 40 * p) < 100 + 20 * p, tick % (200 + 40 * p) >= 100 + 20 * p)
+                             for p in range(players)))
+            snapshot = quantize(capture(state))
+            if base is None or since_key >= keyframe_interval:
+                packet = encode_snapshot(seed, snapshot)
+                since_key = 0
+            else:
+                packet = encode_snapshot(seed, snapshot, base)
+                since_key += 1
+            base = snapshot
+            decoded = decoder.decode(packet)
+
+            _, seed_, score, health, level, baskets, blocks, power_ups = snapshot
+            expected_baskets = [{"x": BASKET.unpack(BASKET.pack(x, *timers))[0],
+                                 "power_up_timers": dict(zip(POWERUP_TYPES, timers))} for x, timers in baskets]
+            same = (decoded is not None and
+                    (decoded["tick"], decoded["seed"], decoded["score"], decoded["health"], decoded["level"]) ==
+                    (state.tick, seed_, score, max(-0x8000, health), level) and
+                    decoded["baskets"] == expected_baskets and
+                    all(numpy.array_equal(a, b) for a, b in zip(decoded["blocks"] + decoded["power_ups"],
+                                                                 blocks + power_ups)))
+            if not same:
+                failures.append(f"seed {seed}, {players} players: tick {state.tick} does not round-trip")
+                break
+    return failures
+
+
+# Listen on an address and print one line per stream per second, or with
+# --check run the round-trip check
+def main(argv):
+    if not argv:
+        print("usage: python telemetry.py HOST:PORT | SOCKET_PATH | --check", file=sys.stderr)
+        return
+    if argv == ["--check"]:
+        failures = check_round_trip()
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        print(f"telemetry round trip: {'FAILED' if failures else 'ok'}")
+        sys.exit(1 if failures else 0)
+    family, address = parse_address(argv[0])
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.bind(address)
+    decoder = TelemetryDecoder()
+    received = {}
+    last_report = time.monotonic()
+    try:
+        while True:
+            data = sock.recv(65536)
+            snapshot = decoder.decode(data)
+            if snapshot is not None:
+                count, size = received.get(snapshot["stream"], (0, 0))
+                received[snapshot["stream"]] = (count + 1, size + len(data))
+            if time.monotonic() - last_report >= 1:
+                last_report = time.monotonic()
+                for stream, (count, size) in received.items():
+                    latest = decoder.snapshots[stream]
+                    print(f"stream {stream}: tick {latest['tick']} score {latest['score']} "
+                          f"health {latest['health']} level {latest['level']} "
+                          f"blocks {len(latest['blocks'][0])} | {count} packets/s, "
+                          f"{size / max(count, 1):.0f} bytes avg", flush=True)
+                received.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        if family == socket.AF_UNIX:
+            os.unlink(address)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,28 @@
+import heapq
+
+
+# Min-heap of callbacks keyed by the tick they are due. advance(now) runs
+# every callback due by that tick, earliest first (ties in the order they
+# were scheduled). Scheduling and running a callback cost O(log n); a tick
+# where nothing is due costs O(1), however many timers are pending. Timers
+# are never cancelled: a callback that may have been superseded (an effect
+# refreshed before it ran out, say) checks for that itself and returns.
+class TimerScheduler:
+    def __init__(self):
+        self.heap = []
+        self.sequence = 0  # Tie-breaker, so callbacks and args are never compared
+
+    def __len__(self):
+        return len(self.heap)
+
+    # Run callback(*args) once advance() reaches tick
+    def schedule(self, tick, callback, *args):
+        heapq.heappush(self.heap, (tick, self.sequence, callback, args))
+        self.sequence += 1
+
+    # Run every callback due at or before now
+    def advance(self, now):
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, _, callback, args = heapq.heappop(heap)
+            callback(*args)
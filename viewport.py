@@ -0,0 +1,102 @@
+import pygame
+
+from simulation import WIDTH, HEIGHT, BLACK
+
+
+# Parse a "WIDTHxHEIGHT" size from the command line
+def parse_size(text):
+    width, sep, height = text.lower().partition("x")
+    if not sep or not width.isdigit() or not height.isdigit() or not int(width) or not int(height):
+        raise ValueError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return int(width), int(height)
+
+
+# Largest rect with the aspect ratio of size that fits centered in
+# display_size; the rest of the display is letterboxed
+def fit_rect(size, display_size):
+    scale = min(display_size[0] / size[0], display_size[1] / size[1])
+    width, height = round(size[0] * scale), round(size[1] * scale)
+    return pygame.Rect((display_size[0] - width) // 2, (display_size[1] - height) // 2, width, height)
+
+
+# The window, and the canvas the game is drawn into. The canvas is the
+# playfield (WIDTH x HEIGHT) times render_scale, independent of the display:
+# a 4K kiosk can draw at 1x or 1.5x and have the finished frame scaled up
+# once, instead of drawing every primitive at native resolution. When the
+# window is exactly the canvas size, the game draws straight into the window.
+# Otherwise present() scales the canvas into a letterboxed rect of the window
+# (pygame.transform.scale into a subsurface, so no surface is allocated per
+# frame), or, with gpu_scaling, SDL scales it on the GPU (pygame.SCALED).
+class Viewport:
+    def __init__(self, render_scale=1.0, display_size=None, fullscreen=False, gpu_scaling=False):
+        self.render_scale = render_scale
+        self.canvas_size = (round(WIDTH * render_scale), round(HEIGHT * render_scale))
+        self.display_size = display_size
+        self.fullscreen = fullscreen
+        self.gpu_scaling = gpu_scaling
+        self.window = None
+        self.canvas = None
+        self.target = None  # Part of the window the canvas is scaled into, or None
+        self.whole_factor = False  # Whether target is a whole multiple of the canvas
+
+    # Open the window; returns the canvas to draw into
+    def open(self):
+        flags = pygame.FULLSCREEN if self.fullscreen else 0
+        if self.gpu_scaling:
+            self.window = self.canvas = pygame.display.set_mode(self.canvas_size, flags | pygame.SCALED)
+            return self.canvas
+        size = self.display_size
+        if size is None:
+            size = (0, 0) if self.fullscreen else self.canvas_size  # (0, 0) is the desktop size
+        elif not self.fullscreen:
+            flags |= pygame.RESIZABLE
+        self.window = pygame.display.set_mode(size, flags)
+        return self.resize(self.window.get_size())
+
+    # Lay the canvas out in a window of a new size; returns the canvas, which
+    # changes when the window switches between matching the canvas and not
+    def resize(self, size):
+        if self.gpu_scaling:
+            return self.canvas
+        self.window = pygame.display.get_surface()
+        if tuple(size) == self.canvas_size:
+            self.canvas = self.window
+            self.target = None
+            return self.canvas
+        if self.canvas is None or self.canvas is self.window:
+            self.canvas = pygame.Surface(self.canvas_size).convert()
+        self.window.fill(BLACK)
+        self.target = self.window.subsurface(fit_rect(self.canvas_size, size))
+        width, height = self.target.get_size()
+        self.whole_factor = width % self.canvas_size[0] == 0 and height % self.canvas_size[1] == 0
+        pygame.display.flip()
+        return self.canvas
+
+    # Scale one canvas rect into the window; returns the window rect it covers
+    def scale_rect(self, rect):
+        rect = rect.clip(self.canvas.get_rect())
+        factor_x = self.target.get_width() // self.canvas_size[0]
+        factor_y = self.target.get_height() // self.canvas_size[1]
+        area = pygame.Rect(rect.left * factor_x, rect.top * factor_y, rect.width * factor_x, rect.height * factor_y)
+        if area:
+            pygame.transform.scale(self.canvas.subsurface(rect), area.size, self.target.subsurface(area))
+        return area.move(self.target.get_offset())
+
+    # Show the canvas: the whole frame, or only the given canvas rects. When
+    # the window is a whole multiple of the canvas, only those rects are
+    # scaled, so dirty-rect rendering also saves the scaling of everything
+    # that did not change. (At fractional factors, scaling pieces separately
+    # would sample pixels differently from scaling the whole frame.)
+    def present(self, rects=None):
+        if rects is not None and not rects:
+            return
+        if self.target is not None:
+            if rects is None or not self.whole_factor:
+                pygame.transform.scale(self.canvas, self.target.get_size(), self.target)
+                rects = None
+            else:
+                rects = [self.scale_rect(rect) for rect in rects]
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)